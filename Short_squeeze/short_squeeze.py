@@ -1,7 +1,9 @@
 import asyncio
+import importlib.util
 import json
 import os
 import re
+import string
 import time
 import warnings
 import random
@@ -13,6 +15,16 @@ import requests
 import yfinance as yf
 from playwright.async_api import async_playwright
 
+try:
+    import httpx
+except ImportError:  # Pooled RegSHO fetch is optional; requests stays as the fallback
+    httpx = None
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 # Suppress pandas warnings
 warnings.filterwarnings("ignore")
 
@@ -20,6 +32,8 @@ warnings.filterwarnings("ignore")
 # Note: In GitHub Actions, cookies might not be available or valid.
 # The script gracefully handles missing cookies by returning 0 hype score.
 COOKIES_PATH = "cookies.json"
+# Saved Playwright session (cookies + localStorage) reused across runs
+PW_STATE_PATH = ".pw_state.json"
 CRAWL_DAYS = 1
 
 # 1. Market Cap Filter (>$50M) & High Short Float (>20%)
@@ -27,11 +41,105 @@ FINVIZ_URL = "https://finviz.com/screener.ashx?v=111&f=sh_float_short_o20,cap_mi
 
 # 2. X Scan Settings
 TOP_X_SCAN_LIMIT = 50
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Extract + filter ticker text in the page: one Playwright round-trip per selector
+TICKER_TEXT_JS = "els => els.map(e => e.textContent.trim()).filter(t => /^[A-Za-z]{1,5}$/.test(t))"
 
 # 3. Minimum Market Cap (in Millions)
 MIN_MKT_CAP_MM = 100
 
 
+# --- REPORT TEMPLATES (parsed once at import) ---
+_CARD_TPL = """
+            <div class="card">
+                <div class="card-header">
+                    <span class="ticker">${ticker}</span>
+                    <span class="price">${price:.2f}</span>
+                </div>
+                <div class="card-body">
+                    <div class="metric-row"><span>Total Score:</span><span class="highlight-blue" style="font-size:18px">{total}</span></div>
+                    <div class="metric-row"><span>X Mentions:</span><span class="highlight-red" style="font-size:18px">🔥 {hype}</span></div>
+                    <div class="metric-row"><span>Short Float:</span><span>{short_float}%</span></div>
+                    <div class="action-badge">{signal}</div>
+                </div>
+            </div>"""
+
+_ROW_TPL = """
+            <tr>
+                <td>{rank}</td>
+                <td><strong><a href="{x_link}" target="_blank" style="color:#fff;text-decoration:none">${ticker}</a></strong></td>
+                <td>${price:.2f}</td>
+                <td style="color:{sig_col}; font-weight:bold;">{sig}</td>
+                <td style="background:rgba(255,255,255,0.05); font-weight:bold; color:#00E396">{total}</td>
+                <td style="{hype_style}">{hype}</td>
+                <td style="{sho_style}">{sho_badge}</td>
+                <td>{short_float}%</td>
+                <td>{rsi}</td>
+                <td style="{vol_style}">{vol_spike}</td>
+                <td>{dtc}</td>
+            </tr>"""
+
+_PAGE_TPL = string.Template("""<!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <title>ParisTrader - Retail Hype Scanner</title>
+            <style>
+                @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
+                body { background:#0f172a; color:#f1f5f9; font-family:'Inter', sans-serif; padding:20px; }
+                .container { max_width:1400px; margin:0 auto; }
+                header { display:flex; justify-content:space-between; margin-bottom:20px; border-bottom:1px solid #334155; padding-bottom:10px; }
+                .brand { font-size:24px; font-weight:700; } .brand span { color:#00E396; }
+
+                .cards-container { display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; margin-bottom: 40px; }
+                .card { background: #1e293b; border-radius: 12px; padding: 20px; border: 1px solid #334155; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1); }
+                .card-header { display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px; }
+                .ticker { font-size: 28px; font-weight: 700; color: #fff; }
+                .price { font-size: 20px; color: #00E396; }
+                .metric-row { display: flex; justify-content: space-between; margin-bottom: 8px; font-size: 14px; color: #cbd5e1; }
+                .highlight-red { color: #FF4560; font-weight: bold; }
+                .highlight-blue { color: #008FFB; font-weight: bold; }
+                .action-badge { background: rgba(0, 227, 150, 0.15); color: #00E396; text-align: center; padding: 8px; border-radius: 6px; font-weight: bold; margin-top: 15px; border: 1px solid rgba(0, 227, 150, 0.3); }
+
+                table { width:100%; border-collapse:collapse; background:#1e293b; border-radius:8px; overflow:hidden; font-size:14px; }
+                th { background:#0f172a; padding:12px; text-align:left; color:#94a3b8; font-size:12px; text-transform:uppercase; }
+                td { padding:12px; border-bottom:1px solid #334155; }
+                tr:hover { background:#334155; cursor:pointer; }
+
+                h2 { color: #fff; margin-bottom: 20px; font-size: 20px; border-left: 4px solid #00E396; padding-left: 10px; }
+                .legend { margin-top:20px; font-size:12px; color:#64748b; text-align:center; }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <header>
+                    <div class="brand">Short Squeeze <span>LEADERBOARD</span></div>
+                    <div>$timestamp</div>
+                </header>
+
+                <h2>🔥 Top Retail Wisdom Picks (Hype Weighted)</h2>
+                <div class="cards-container">$cards</div>
+
+                <h2>📊 Full Market Scan (wait for the signal, check every day)</h2>
+                <table>
+                    <thead>
+                        <tr>
+                            <th>Rank</th><th>Symbol</th><th>Price</th><th>Signal</th>
+                            <th>Total Score</th><th>X Hype</th>
+                            <th>Reg SHO</th><th>Short Float</th><th>RSI</th><th>Vol Spike</th><th>DTC</th>
+                        </tr>
+                    </thead>
+                    <tbody>$rows</tbody>
+                </table>
+                <div class="legend">
+                    <strong>Total Score:</strong> Fundamentals + (X Mentions * 2). Retail Hype is the primary driver. <br>
+                    <strong>X Hype:</strong> Volume of recent "squeeze" tweets.
+                </div>
+            </div>
+        </body></html>""")
+
+
 class RegSHO:
     """Downloads official Nasdaq Regulation SHO Threshold List."""
 
@@ -39,21 +147,46 @@ class RegSHO:
         self.base_url = "http://www.nasdaqtrader.com/dynamic/symdir/regsho/nasdaqth{date}.txt"
         self.sho_list = self._get_sho_list()
 
+    def _parse(self, date_str, text):
+        symbols = frozenset(line.split("|")[0].strip().upper() for line in text.splitlines() if "|" in line and len(line) > 5)
+        print(f"[RegSHO] Loaded list for {date_str}: {len(symbols)} tickers.")
+        return symbols
+
+    async def _fetch_all(self, date_strs):
+        # One pooled connection, all candidate dates in flight at once
+        # requests followed redirects by default; httpx has to be told to
+        async with httpx.AsyncClient(http2=HTTP2_AVAILABLE, timeout=5.0, follow_redirects=True) as client:
+            return await asyncio.gather(*(client.get(self.base_url.format(date=d)) for d in date_strs),
+                                        return_exceptions=True)
+
     def _get_sho_list(self):
         print("[RegSHO] Fetching official Threshold List...")
-        for i in range(3):
-            d = datetime.utcnow() - timedelta(days=i)
-            date_str = d.strftime("%Y%m%d")
+        date_strs = [(datetime.utcnow() - timedelta(days=i)).strftime("%Y%m%d") for i in range(3)]
+
+        if httpx is not None:
             try:
-                r = requests.get(self.base_url.format(date=date_str), timeout=5)
-                if r.status_code == 200:
-                    lines = r.text.splitlines()
-                    symbols = {line.split("|")[0].strip().upper() for line in lines if "|" in line and len(line) > 5}
-                    print(f"[RegSHO] Loaded list for {date_str}: {len(symbols)} tickers.")
-                    return symbols
-            except:
-                continue
-        return set()
+                responses = asyncio.run(self._fetch_all(date_strs))
+            except Exception as e:
+                print(f"[RegSHO] Fetch failed: {e}")
+                return frozenset()
+            # Most recent date wins, same as the sequential order
+            for date_str, r in zip(date_strs, responses):
+                if not isinstance(r, Exception) and r.status_code == 200:
+                    return self._parse(date_str, r.text)
+            for date_str, r in zip(date_strs, responses):
+                print(f"[RegSHO] {date_str}: {r if isinstance(r, Exception) else f'HTTP {r.status_code}'}")
+            print("[RegSHO] ⚠️ No threshold list found; RegSHO flags will be empty.")
+            return frozenset()
+
+        with requests.Session() as session:
+            for date_str in date_strs:
+                try:
+                    r = session.get(self.base_url.format(date=date_str), timeout=5)
+                    if r.status_code == 200:
+                        return self._parse(date_str, r.text)
+                except:
+                    continue
+        return frozenset()
 
     def is_on_list(self, ticker):
         return ticker in self.sho_list
@@ -87,12 +220,8 @@ class DataScanner:
                 except:
                     pass  # Continue even if timeout, might be loaded already
 
-                links = await page.locator('a.screener-link-primary').all_inner_texts()
-                if not links: links = await page.locator('a[href*="quote.ashx?t="]').all_inner_texts()
-
-                for t in links:
-                    t = t.strip()
-                    if t.isalpha() and len(t) < 6: tickers.append(t)
+                tickers = await page.locator('a.screener-link-primary').evaluate_all(TICKER_TEXT_JS)
+                if not tickers: tickers = await page.locator('a[href*="quote.ashx?t="]').evaluate_all(TICKER_TEXT_JS)
 
                 if tickers:
                     print(f"[DataScanner] Finviz Success: Found {len(tickers)} tickers.")
@@ -105,10 +234,7 @@ class DataScanner:
             if not tickers:
                 try:
                     await page.goto(self.mw_url, timeout=30000)
-                    rows = await page.locator('div.table__cell a.link').all_inner_texts()
-                    for t in rows:
-                        t = t.strip()
-                        if t.isalpha() and len(t) < 6: tickers.append(t)
+                    tickers = await page.locator('div.table__cell a.link').evaluate_all(TICKER_TEXT_JS)
                 except:
                     pass
 
@@ -116,10 +242,7 @@ class DataScanner:
             if not tickers:
                 try:
                     await page.goto(self.hsi_url, timeout=20000)
-                    tds = await page.locator('table.stocks tr td:nth-child(1)').all_inner_texts()
-                    for t in tds:
-                        t = t.strip()
-                        if t.isalpha() and len(t) < 6: tickers.append(t)
+                    tickers = await page.locator('table.stocks tr td:nth-child(1)').evaluate_all(TICKER_TEXT_JS)
                 except:
                     pass
 
@@ -136,36 +259,60 @@ class SocialScanner:
     def __init__(self):
         # Use relative path for cookies or environment variable if needed
         self.cookies_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), COOKIES_PATH)
+        self.state_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), PW_STATE_PATH)
 
     async def check_social_sentiment(self, tickers):
-        if not os.path.exists(self.cookies_path):
+        sentiment_map = {}
+        has_state = os.path.exists(self.state_path)
+        has_cookies = os.path.exists(self.cookies_path)
+        if not has_state and not has_cookies:
             print("[SocialScanner] No cookies found. Skipping X scan (Scores will be 0).")
-            return {}
+            return sentiment_map
+        # Freshly exported cookies replace the saved session
+        if has_state and has_cookies and os.path.getmtime(self.cookies_path) > os.path.getmtime(self.state_path):
+            print("[SocialScanner] cookies.json is newer than the saved session, using cookies.")
+            has_state = False
 
-        sentiment_map = {}
         async with async_playwright() as p:
             args = ['--disable-blink-features=AutomationControlled', '--no-sandbox']
             # Headless must be True for CI/CD environments
             browser = await p.chromium.launch(headless=True, args=args)
-            context = await browser.new_context(viewport={"width": 1280, "height": 800})
 
-            try:
-                with open(self.cookies_path, 'r') as f:
-                    cookies = json.load(f)
-                    clean_cookies = []
-                    for c in cookies:
-                        if "sameSite" in c and c["sameSite"] not in ["Strict", "Lax", "None"]: del c["sameSite"]
-                        if "expirationDate" in c: c["expires"] = c.pop("expirationDate")
-                        clean_cookies.append(c)
+            context = None
+            if has_state:
+                # Warm start: session saved by the previous run
+                try:
+                    context = await browser.new_context(storage_state=self.state_path,
+                                                        viewport={"width": 1280, "height": 800})
+                except Exception as e:
+                    print(f"[SocialScanner] Error loading saved session: {e}")
+
+            if context is None:
+                if not has_cookies:
+                    print("[SocialScanner] No cookies found. Skipping X scan (Scores will be 0).")
+                    await browser.close()
+                    return sentiment_map
+                context = await browser.new_context(viewport={"width": 1280, "height": 800})
+                try:
+                    with open(self.cookies_path, 'rb') as f:
+                        cookies = json_loads(f.read())
+                    # Browser exports -> Playwright: drop invalid sameSite, rename expirationDate
+                    clean_cookies = [
+                        {("expires" if k == "expirationDate" else k): v for k, v in c.items()
+                         if not (k == "sameSite" and v not in ("Strict", "Lax", "None"))}
+                        for c in cookies
+                    ]
                     await context.add_cookies(clean_cookies)
-            except Exception as e:
-                print(f"[SocialScanner] Error loading cookies: {e}")
-                await browser.close()
-                return {}
+                except Exception as e:
+                    print(f"[SocialScanner] Error loading cookies: {e}")
+                    await browser.close()
+                    return sentiment_map
 
             page = await context.new_page()
             print(f"[SocialScanner] Analyzing X Hype for top {len(tickers)} tickers...")
 
+            logged_in = False
+
             for i, ticker in enumerate(tickers):
                 print(f"\r   > [{i + 1}/{len(tickers)}] Checking ${ticker}...", end="", flush=True)
                 try:
@@ -175,12 +322,22 @@ class SocialScanner:
                     content = await page.content()
                     if "No results for" in content:
                         sentiment_map[ticker] = 0
+                        logged_in = True
                     else:
                         cnt = await page.locator('article').count()
                         sentiment_map[ticker] = cnt
+                        logged_in = logged_in or cnt > 0
                 except:
                     sentiment_map[ticker] = 0
             print("")
+            # Only a session that actually got search results is worth keeping for the next run
+            if logged_in:
+                try:
+                    await context.storage_state(path=self.state_path)
+                except Exception as e:
+                    print(f"[SocialScanner] Could not save session state: {e}")
+            else:
+                print("[SocialScanner] ⚠️ No search returned results (logged out?); session state not saved.")
             await browser.close()
         return sentiment_map
 
@@ -190,13 +347,13 @@ class ShortSqueezePro:
         # Base dir is the location of this script
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
 
-    def get_financial_data(self, ticker, reg_sho):
+    def get_financial_data(self, ticker):
         yf_obj = yf.Ticker(ticker)
         res = {
             'valid': False, 'price': 0, 'mkt_cap_mm': 0,
             'short_float': 0, 'si_change_1m': 0, 'float_utilization': 0,
             'dtc': 0, 'price_momo_1m': 0, 'rsi': 0, 'vol_spike': "NO",
-            'reg_sho': False, 'error': None
+            'error': None
         }
 
         try:
@@ -212,7 +369,6 @@ class ShortSqueezePro:
 
             res['valid'] = True
             res['mkt_cap_mm'] = mkt_cap_mm
-            res['reg_sho'] = reg_sho.is_on_list(ticker)
             res['short_float'] = round(info.get('shortPercentOfFloat', 0) * 100, 2)
             res['dtc'] = info.get('shortRatio', 0)
 
@@ -260,129 +416,53 @@ class ShortSqueezePro:
     def generate_html_report(self, df, filename):
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
 
-        # New "Hype-Based" Signal
-        def get_signal(row):
-            score = row['Total_Score']
-            hype = row['X_Mentions']
-
-            # If Hype is extreme, it's always an ALERT
-            if hype >= 10: return "🔥 VIRAL SQUEEZE"
-            if score >= 80: return "🚀 SQUEEZE ALERT"
-            if score >= 50: return "👀 WATCH"
-            return "AVOID"
-
-        df['Signal'] = df.apply(get_signal, axis=1)
+        # New "Hype-Based" Signal (if Hype is extreme, it's always an ALERT)
+        conditions = [df['X_Mentions'] >= 10, df['Total_Score'] >= 80, df['Total_Score'] >= 50]
+        choices = ["🔥 VIRAL SQUEEZE", "🚀 SQUEEZE ALERT", "👀 WATCH"]
+        df['Signal'] = np.select(conditions, choices, default="AVOID")
 
         # --- SECTION 1: TOP SQUEEZE OPPORTUNITIES (Cards) ---
         top_picks = df[df['Signal'].str.contains("SQUEEZE")].head(3)
         if top_picks.empty: top_picks = df.head(3)
 
-        cards_html = ""
-        for _, row in top_picks.iterrows():
-            cards_html += f"""
-            <div class="card">
-                <div class="card-header">
-                    <span class="ticker">${row['Ticker']}</span>
-                    <span class="price">${row['Price']:.2f}</span>
-                </div>
-                <div class="card-body">
-                    <div class="metric-row"><span>Total Score:</span><span class="highlight-blue" style="font-size:18px">{int(row['Total_Score'])}</span></div>
-                    <div class="metric-row"><span>X Mentions:</span><span class="highlight-red" style="font-size:18px">🔥 {row['X_Mentions']}</span></div>
-                    <div class="metric-row"><span>Short Float:</span><span>{row['Short_Float%']}%</span></div>
-                    <div class="action-badge">{row['Signal']}</div>
-                </div>
-            </div>"""
+        cards = []
+        for ticker, price, total, hype, short_float, signal in top_picks[
+                ['Ticker', 'Price', 'Total_Score', 'X_Mentions', 'Short_Float%', 'Signal']].itertuples(index=False, name=None):
+            cards.append(_CARD_TPL.format_map({
+                'ticker': ticker, 'price': price, 'total': int(total), 'hype': hype,
+                'short_float': short_float, 'signal': signal
+            }))
+        cards_html = "".join(cards)
 
         # --- SECTION 2: FULL MARKET SCAN (Table) ---
-        table_rows = ""
-        rank = 1
-        for _, row in df.iterrows():
-            sig_col = "#00E396" if "SQUEEZE" in row['Signal'] else "#FEB019" if "WATCH" in row['Signal'] else "#FF4560"
-            sho_badge = "✅ YES" if row['RegSHO'] else "-"
-            sho_style = "color:#FF4560; font-weight:bold" if row['RegSHO'] else "color:#64748b"
-            vol_style = "color:#FEB019; font-weight:bold" if row['Vol_Spike'] == "YES" else ""
-
-            # Hype highlighting
-            hype_style = "color:#fff"
-            if row['X_Mentions'] >= 5: hype_style = "color:#00E396; font-weight:bold; font-size:15px"
-            if row['X_Mentions'] >= 10: hype_style = "color:#FF4560; font-weight:bold; font-size:16px"
-
-            x_link = f"https://x.com/search?q=%24{row['Ticker']}%20squeeze"
-
-            table_rows += f"""
-            <tr>
-                <td>{rank}</td>
-                <td><strong><a href="{x_link}" target="_blank" style="color:#fff;text-decoration:none">${row['Ticker']}</a></strong></td>
-                <td>${row['Price']:.2f}</td>
-                <td style="color:{sig_col}; font-weight:bold;">{row['Signal']}</td>
-                <td style="background:rgba(255,255,255,0.05); font-weight:bold; color:#00E396">{int(row['Total_Score'])}</td>
-                <td style="{hype_style}">{row['X_Mentions']}</td>
-                <td style="{sho_style}">{sho_badge}</td>
-                <td>{row['Short_Float%']}%</td>
-                <td>{row['RSI']}</td>
-                <td style="{vol_style}">{row['Vol_Spike']}</td>
-                <td>{row['Days_to_Cover']}</td>
-            </tr>"""
-            rank += 1
-
-        html = f"""<!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <title>ParisTrader - Retail Hype Scanner</title>
-            <style>
-                @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
-                body {{ background:#0f172a; color:#f1f5f9; font-family:'Inter', sans-serif; padding:20px; }}
-                .container {{ max_width:1400px; margin:0 auto; }}
-                header {{ display:flex; justify-content:space-between; margin-bottom:20px; border-bottom:1px solid #334155; padding-bottom:10px; }}
-                .brand {{ font-size:24px; font-weight:700; }} .brand span {{ color:#00E396; }}
-
-                .cards-container {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; margin-bottom: 40px; }}
-                .card {{ background: #1e293b; border-radius: 12px; padding: 20px; border: 1px solid #334155; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1); }}
-                .card-header {{ display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px; }}
-                .ticker {{ font-size: 28px; font-weight: 700; color: #fff; }}
-                .price {{ font-size: 20px; color: #00E396; }}
-                .metric-row {{ display: flex; justify-content: space-between; margin-bottom: 8px; font-size: 14px; color: #cbd5e1; }}
-                .highlight-red {{ color: #FF4560; font-weight: bold; }}
-                .highlight-blue {{ color: #008FFB; font-weight: bold; }}
-                .action-badge {{ background: rgba(0, 227, 150, 0.15); color: #00E396; text-align: center; padding: 8px; border-radius: 6px; font-weight: bold; margin-top: 15px; border: 1px solid rgba(0, 227, 150, 0.3); }}
-
-                table {{ width:100%; border-collapse:collapse; background:#1e293b; border-radius:8px; overflow:hidden; font-size:14px; }}
-                th {{ background:#0f172a; padding:12px; text-align:left; color:#94a3b8; font-size:12px; text-transform:uppercase; }}
-                td {{ padding:12px; border-bottom:1px solid #334155; }}
-                tr:hover {{ background:#334155; cursor:pointer; }}
-
-                h2 {{ color: #fff; margin-bottom: 20px; font-size: 20px; border-left: 4px solid #00E396; padding-left: 10px; }}
-                .legend {{ margin-top:20px; font-size:12px; color:#64748b; text-align:center; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <header>
-                    <div class="brand">Short Squeeze <span>LEADERBOARD</span></div>
-                    <div>{timestamp}</div>
-                </header>
-
-                <h2>🔥 Top Retail Wisdom Picks (Hype Weighted)</h2>
-                <div class="cards-container">{cards_html}</div>
-
-                <h2>📊 Full Market Scan (wait for the signal, check every day)</h2>
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Rank</th><th>Symbol</th><th>Price</th><th>Signal</th>
-                            <th>Total Score</th><th>X Hype</th>
-                            <th>Reg SHO</th><th>Short Float</th><th>RSI</th><th>Vol Spike</th><th>DTC</th>
-                        </tr>
-                    </thead>
-                    <tbody>{table_rows}</tbody>
-                </table>
-                <div class="legend">
-                    <strong>Total Score:</strong> Fundamentals + (X Mentions * 2). Retail Hype is the primary driver. <br>
-                    <strong>X Hype:</strong> Volume of recent "squeeze" tweets.
-                </div>
-            </div>
-        </body></html>"""
+        # Per-row styles are resolved column-wise up front
+        signal = df['Signal'].astype(str)
+        reg_sho = df['RegSHO'].astype(bool)
+        cols = df[['Ticker', 'Price', 'Signal', 'Total_Score', 'X_Mentions', 'Short_Float%', 'RSI', 'Vol_Spike', 'Days_to_Cover']].assign(
+            sig_col=np.select([signal.str.contains("SQUEEZE"), signal.str.contains("WATCH")],
+                              ["#00E396", "#FEB019"], default="#FF4560"),
+            hype_style=np.select([df['X_Mentions'] >= 10, df['X_Mentions'] >= 5],
+                                 ["color:#FF4560; font-weight:bold; font-size:16px",
+                                  "color:#00E396; font-weight:bold; font-size:15px"], default="color:#fff"),
+            sho_style=np.where(reg_sho, "color:#FF4560; font-weight:bold", "color:#64748b"),
+            sho_badge=np.where(reg_sho, "✅ YES", "-"),
+            vol_style=np.where(df['Vol_Spike'] == "YES", "color:#FEB019; font-weight:bold", ""),
+        )
+
+        rows = []
+        for rank, (ticker, price, sig, total, hype, short_float, rsi, vol_spike, dtc,
+                   sig_col, hype_style, sho_style, sho_badge, vol_style) in enumerate(
+                cols.itertuples(index=False, name=None), start=1):
+            rows.append(_ROW_TPL.format_map({
+                'rank': rank, 'ticker': ticker, 'price': price, 'sig': sig, 'total': int(total), 'hype': hype,
+                'short_float': short_float, 'rsi': rsi, 'vol_spike': vol_spike, 'dtc': dtc,
+                'x_link': f"https://x.com/search?q=%24{ticker}%20squeeze",
+                'sig_col': sig_col, 'hype_style': hype_style, 'sho_style': sho_style,
+                'sho_badge': sho_badge, 'vol_style': vol_style
+            }))
+        table_rows = "".join(rows)
+
+        html = _PAGE_TPL.substitute(timestamp=timestamp, cards=cards_html, rows=table_rows)
 
         with open(filename, "w", encoding="utf-8") as f:
             f.write(html)
@@ -411,21 +491,12 @@ class ShortSqueezePro:
         # Step 2: Scoring Fundamentals
         for i, ticker in enumerate(tickers):
             print(f"\rProcessing {i + 1}/{len(tickers)}: {ticker}...", end="", flush=True)
-            data = self.get_financial_data(ticker, reg_sho)
+            data = self.get_financial_data(ticker)
 
             if not data['valid']: continue
 
-            # BASE SCORE (Fundamentals)
-            base_score = 0
-            base_score += min(40, data['short_float'])
-            base_score += min(20, data['dtc'] * 2)
-            if data['reg_sho']: base_score += 20
-            if data['price_momo_1m'] > 20: base_score += 10
-            if data['vol_spike'] == "YES": base_score += 10
-
             results.append({
-                "Ticker": ticker, "Base_Score": base_score, "Price": data['price'],
-                "RegSHO": data['reg_sho'], "Short_Float%": data['short_float'],
+                "Ticker": ticker, "Price": data['price'], "Short_Float%": data['short_float'],
                 "SI_Chg_1M": data['si_change_1m'], "Days_to_Cover": data['dtc'],
                 "Mkt_Cap_MM": data['mkt_cap_mm'], "Float_Unshorted_MM": data['float_utilization'],
                 "Price_Momo_1M": data['price_momo_1m'], "RSI": data['rsi'],
@@ -436,7 +507,17 @@ class ShortSqueezePro:
         # We check MORE candidates now (Top 50) to catch hidden viral stocks
         df = pd.DataFrame(results)
         if not df.empty:
+            df['RegSHO'] = df['Ticker'].isin(reg_sho.sho_list)
+
+            # BASE SCORE (Fundamentals)
+            df['Base_Score'] = (np.minimum(40, df['Short_Float%'])
+                                + np.minimum(20, df['Days_to_Cover'] * 2)
+                                + np.where(df['RegSHO'], 20, 0)
+                                + np.where(df['Price_Momo_1M'] > 20, 10, 0)
+                                + np.where(df['Vol_Spike'] == "YES", 10, 0))
+
             df = df.sort_values(by='Base_Score', ascending=False)
+            # Every top candidate is scanned: >= 10 mentions is VIRAL SQUEEZE whatever the base score
             candidates_to_check = df.head(TOP_X_SCAN_LIMIT)['Ticker'].tolist()
 
             print(f"\n\nChecking Retail Wisdom (X Hype) for Top {len(candidates_to_check)} candidates...")
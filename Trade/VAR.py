@@ -1,7 +1,26 @@
+import asyncio
+import hashlib
+import importlib.util
+import os
+import time
+from datetime import date
+
 import pandas as pd
 import numpy as np
 import yfinance as yf
 
+try:
+    import httpx
+except ImportError:  # Direct chart API pull is optional; yf.download is the fallback
+    httpx = None
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+CHART_URL = "https://query2.finance.yahoo.com/v8/finance/chart/{ticker}"
+PERIOD_DAYS = {"1y": 365, "2y": 730, "5y": 1825}
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+MC_SIMS = 1_000_000
+MC_SEED = 42
+
 # Your open positions (update prices if needed for latest)
 positions = {
     'GOOGL': {'direction': 'LONG', 'shares': 500, 'price': 313.51},
@@ -14,6 +33,56 @@ positions = {
     'SOFI': {'direction': 'LONG', 'shares': 2000, 'price': 27.07},
 }
 
+
+async def _fetch_adj_close_chart(tickers, period):
+    end = int(time.time())
+    params = {'period1': end - PERIOD_DAYS[period] * 86400, 'period2': end, 'interval': '1d'}
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    async with httpx.AsyncClient(http2=HTTP2_AVAILABLE, timeout=15.0, headers=headers) as client:
+        responses = await asyncio.gather(
+            *(client.get(CHART_URL.format(ticker=t), params=params) for t in tickers))
+
+    series = []
+    for t, r in zip(tickers, responses):
+        r.raise_for_status()
+        result = r.json()['chart']['result'][0]
+        # Timestamps are the session open in UTC; shift to exchange time before taking the date
+        times = np.asarray(result['timestamp'], dtype=np.int64) + result['meta'].get('gmtoffset', 0)
+        closes = np.array(result['indicators']['adjclose'][0]['adjclose'], dtype=np.float32)
+        s = pd.Series(closes, index=pd.to_datetime(times, unit='s').normalize(), name=t)
+        series.append(s[~s.index.duplicated(keep='last')])
+    return pd.concat(series, axis=1)
+
+
+def download_adj_close(tickers, period):
+    """Adj Close from Yahoo's chart API in parallel, falling back to yf.download."""
+    if httpx is not None and period in PERIOD_DAYS:
+        try:
+            return asyncio.run(_fetch_adj_close_chart(tickers, period))
+        except Exception as e:
+            print(f"Chart API download failed ({e}), falling back to yfinance.")
+    data = yf.download(tickers, period=period, auto_adjust=False, actions=False)
+    # float32 is plenty for VaR and halves the bandwidth through pct_change / matmul
+    return data.xs('Adj Close', axis=1, level=0, drop_level=True).astype(np.float32)
+
+
+def cached_download(tickers, period):
+    """Adj Close prices for tickers, cached as parquet for the rest of the day."""
+    key = hashlib.md5((",".join(sorted(tickers)) + period + date.today().isoformat()).encode()).hexdigest()
+    path = os.path.join(CACHE_DIR, f"{key}.parquet")
+    if os.path.exists(path):
+        return pd.read_parquet(path)[tickers]
+
+    # Keep only Adj Close so the cache holds just what VaR needs
+    data = download_adj_close(tickers, period)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        data.to_parquet(path)
+    except Exception as e:
+        print(f"Cache write skipped: {e}")
+    return data[tickers]
+
+
 # Calculate values and weights
 df = pd.DataFrame.from_dict(positions, orient='index')
 df['value'] = df['shares'] * df['price']
@@ -24,8 +93,8 @@ df['weight'] = df['abs_value'] / total_abs
 
 tickers = list(positions.keys())
 
-# Download data with explicit auto_adjust=False
-data = yf.download(tickers, period="2y", auto_adjust=False)['Adj Close']
+# Download data with explicit auto_adjust=False (cached per day)
+data = cached_download(tickers, "2y")
 
 # Calculate daily returns
 returns = data.pct_change().dropna()
@@ -39,19 +108,30 @@ print(f"Absolute Exposure (for VaR base): ${total_abs:,.0f}")
 # Weights in same order as tickers
 weights = df['weight'].values
 
-# Historical Simulation VaR
-port_returns_hist = returns.dot(weights)
-var_95_hist = -np.percentile(port_returns_hist, 5)  # Positive loss
-var_99_hist = -np.percentile(port_returns_hist, 1)
+# Historical Simulation VaR (one matrix-vector product, both quantiles in one pass)
+r = returns.to_numpy(copy=False)
+port_returns_hist = r @ weights.astype(r.dtype)
+var_99_hist, var_95_hist = -np.quantile(port_returns_hist, [0.01, 0.05])  # Positive loss
 
 print(f"\nHistorical 1-Day 95% VaR: ${var_95_hist * total_abs:,.0f} ({var_95_hist*100:.2f}%)")
 print(f"Historical 1-Day 99% VaR: ${var_99_hist * total_abs:,.0f} ({var_99_hist*100:.2f}%)")
 
 # Parametric VaR (assumes normality)
-daily_vol = port_returns_hist.std()
+daily_vol = port_returns_hist.std(ddof=1)
 var_95_param = 1.65 * daily_vol * total_abs
 var_99_param = 2.33 * daily_vol * total_abs
 
 print(f"\nDaily Portfolio Volatility: {daily_vol*100:.2f}%")
 print(f"Parametric 1-Day 95% VaR: ${var_95_param:,.0f}")
-print(f"Parametric 1-Day 99% VaR: ${var_99_param:,.0f}")
\ No newline at end of file
+print(f"Parametric 1-Day 99% VaR: ${var_99_param:,.0f}")
+
+# Monte Carlo VaR (correlated normal draws via Cholesky of the covariance matrix)
+cov = np.cov(r.T)
+L = np.linalg.cholesky(cov)
+rng = np.random.Generator(np.random.PCG64(MC_SEED))
+Z = rng.standard_normal((MC_SIMS, r.shape[1]))
+port_sim = (Z @ L.T + r.mean(axis=0)) @ weights.astype(np.float64)
+var_99_mc, var_95_mc = -np.quantile(port_sim, [0.01, 0.05])
+
+print(f"\nMonte Carlo 1-Day 95% VaR: ${var_95_mc * total_abs:,.0f} ({var_95_mc*100:.2f}%)")
+print(f"Monte Carlo 1-Day 99% VaR: ${var_99_mc * total_abs:,.0f} ({var_99_mc*100:.2f}%)")
\ No newline at end of file
@@ -7,13 +7,24 @@ and specific visual styling/stats from trade_app.py
 
 import pandas as pd
 import yfinance as yf
-import plotly.graph_objects as go
 import plotly.io as pio
 import os
 import time
+import asyncio
+import base64
+import importlib.util
 import numpy as np
 from datetime import datetime
 
+try:
+    import httpx
+except ImportError:  # Spark batching is optional; yf.download covers every symbol without it
+    httpx = None
+
+# Serialize figures in C when orjson is installed
+if importlib.util.find_spec("orjson") is not None:
+    pio.json.config.default_engine = "orjson"
+
 # ==========================================
 # 1. Configuration
 # ==========================================
@@ -27,10 +38,89 @@ OUTPUT_HTML = os.path.join(BASE_DIR, f"trade_record_{timestamp_str}.html")
 # Capital Settings (USD Base)
 TOTAL_CAPITAL_USD = 1_000_000
 
+# Contract multipliers (everything else trades at 1x)
+CONTRACT_MULTIPLIERS = {"USDJPY": 1000, "NQ=F": 20, "ES=F": 50}
+
+# Yahoo spark endpoint: up to 20 symbols per request
+SPARK_URL = "https://query1.finance.yahoo.com/v8/finance/spark"
+SPARK_BATCH_SIZE = 20
+
 
 # ==========================================
 # 2. Market Data Update Logic
 # ==========================================
+def _parse_spark(payload):
+    # v8 returns {symbol: {close: [...]}}, v7 wraps it in spark.result[].response[]
+    if 'spark' in payload:
+        closes = {}
+        for res in payload['spark'].get('result') or []:
+            resp = (res.get('response') or [{}])[0]
+            quote = (resp.get('indicators', {}).get('quote') or [{}])[0]
+            closes[res.get('symbol')] = quote.get('close') or []
+    else:
+        closes = {sym: v.get('close') or [] for sym, v in payload.items() if isinstance(v, dict)}
+
+    prices = {}
+    for sym, series in closes.items():
+        valid = [c for c in series if c is not None]
+        if valid:
+            prices[sym] = float(valid[-1])
+    return prices
+
+
+async def _fetch_spark(symbols):
+    chunks = [symbols[i:i + SPARK_BATCH_SIZE] for i in range(0, len(symbols), SPARK_BATCH_SIZE)]
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    async with httpx.AsyncClient(timeout=10.0, headers=headers) as client:
+        responses = await asyncio.gather(
+            *(client.get(SPARK_URL, params={'symbols': ','.join(c), 'range': '5d', 'interval': '1d'}) for c in chunks),
+            return_exceptions=True
+        )
+
+    prices = {}
+    for r in responses:
+        if isinstance(r, Exception) or r.status_code != 200:
+            continue
+        try:
+            prices.update(_parse_spark(r.json()))
+        except ValueError:
+            continue
+    return prices
+
+
+def fetch_last_prices(yf_tickers):
+    """Last close per Yahoo symbol: batched spark requests, yf.download for futures and misses."""
+    prices = {}
+    spark_syms = [s for s in yf_tickers if not s.endswith('=F')]
+    if httpx is not None and spark_syms:
+        try:
+            prices = asyncio.run(_fetch_spark(spark_syms))
+        except Exception as e:
+            print(f"Spark fetch failed ({e}), falling back to yfinance.")
+
+    missing = [s for s in yf_tickers if s not in prices]
+    if not missing:
+        return prices
+
+    data = yf.download(missing, period="5d", group_by='ticker', progress=False, threads=True)
+    if data.empty:
+        return prices
+
+    for yf_sym in missing:
+        close_series = None
+        if isinstance(data.columns, pd.MultiIndex):
+            if yf_sym in data.columns.levels[0]:
+                close_series = data[yf_sym]['Close']
+        elif len(missing) == 1 and 'Close' in data.columns:
+            close_series = data['Close']
+
+        if close_series is not None:
+            last_valid_idx = close_series.last_valid_index()
+            if last_valid_idx:
+                prices[yf_sym] = float(close_series.loc[last_valid_idx])
+    return prices
+
+
 def update_active_trades():
     print("--- Starting Market Data Update ---")
     if not os.path.exists(CSV_FILE):
@@ -70,70 +160,28 @@ def update_active_trades():
 
         try:
             # Download Data
-            data = yf.download(yf_tickers, period="5d", group_by='ticker', progress=False, threads=True)
+            last_prices = fetch_last_prices(yf_tickers)
 
-            if data.empty:
+            if not last_prices:
                 print("❌ Download returned no data.")
             else:
-                for index, row in df.iterrows():
-                    if str(row['Status']).upper() != 'OPEN':
-                        continue
-
-                    ticker = row['Ticker']
-                    yf_sym = yf_mapping.get(ticker, ticker)
-
-                    try:
-                        last_price = None
-
-                        if isinstance(data.columns, pd.MultiIndex):
-                            if yf_sym in data.columns.levels[0]:
-                                close_series = data[yf_sym]['Close']
-                                last_valid_idx = close_series.last_valid_index()
-                                if last_valid_idx:
-                                    last_price = close_series.loc[last_valid_idx]
-                        else:
-                            if len(yf_tickers) == 1 or yf_sym in yf_tickers:
-                                if 'Close' in data.columns:
-                                    last_valid_idx = data['Close'].last_valid_index()
-                                    if last_valid_idx:
-                                        last_price = data.loc[last_valid_idx, 'Close']
-
-                        if last_price is not None:
-                            last_price = float(last_price)
-
-                            # 1. Update LastPrice
-                            df.at[index, 'LastPrice'] = round(last_price, 4)
-
-                            # 2. Define Multiplier
-                            multiplier = 1
-                            if ticker == "USDJPY":
-                                multiplier = 1000
-                            elif ticker == "SI=F":
-                                multiplier = 1
-                            elif ticker == "NQ=F":
-                                multiplier = 20
-                            elif ticker == "ES=F":
-                                multiplier = 50
-
-                            # 3. Calculate PnL
-                            entry = float(row['EntryPrice'])
-                            qty = float(row['Quantity'])
-                            is_long = str(row['Direction']).upper() == 'LONG'
-                            diff = (last_price - entry) if is_long else (entry - last_price)
-                            pnl = diff * qty * multiplier
-
-                            df.at[index, 'PnLUSD'] = round(pnl, 2)
-
-                            # 4. Update Market Value (Exposure)
-                            # Store pure magnitude here, direction is handled by 'Direction' column
-                            df.at[index, 'USDNotional'] = round(last_price * qty * multiplier, 2)
-
-                            print(f"✅ {ticker}: Last={last_price:.2f}, PnL={pnl:.0f}")
-                        else:
-                            print(f"❌ Failed to extract price for {ticker}")
-
-                    except Exception as e:
-                        print(f"Error processing row {index} ({ticker}): {e}")
+                prices = df['Ticker'].map(yf_mapping).map(last_prices).where(active_mask)
+                found = prices.notna()
+                for ticker in df.loc[active_mask & ~found, 'Ticker']:
+                    print(f"❌ Failed to extract price for {ticker}")
+
+                # Store pure magnitude in USDNotional, direction is handled by 'Direction' column
+                mult = df['Ticker'].map(CONTRACT_MULTIPLIERS).fillna(1)
+                qty = df['Quantity'].astype(float)
+                sign = np.where(df['Direction'].astype(str).str.upper() == 'LONG', 1, -1)
+                pnl = (prices - df['EntryPrice'].astype(float)) * sign * qty * mult
+
+                df.loc[found, 'LastPrice'] = prices[found].round(4)
+                df.loc[found, 'PnLUSD'] = pnl[found].round(2)
+                df.loc[found, 'USDNotional'] = (prices * qty * mult)[found].round(2)
+
+                for ticker, last_price, row_pnl in zip(df.loc[found, 'Ticker'], prices[found], pnl[found]):
+                    print(f"✅ {ticker}: Last={last_price:.2f}, PnL={row_pnl:.0f}")
 
         except Exception as e:
             print(f"Global Error in download: {e}")
@@ -145,30 +193,50 @@ def update_active_trades():
 # ==========================================
 # 3. Data Loading & Stats
 # ==========================================
+REQUIRED_COLS = ['Ticker', 'Direction', 'Status', 'USDNotional', 'PnLUSD', 'EntryDate', 'EntryPrice', 'Quantity',
+                 'Notes', 'LastPrice']
+NUMERIC_COLS = {'USDNotional', 'PnLUSD', 'EntryPrice', 'Quantity', 'LastPrice'}
+# Dollar totals are shown rounded: float32 is enough and halves the bytes per pass.
+# Prices are printed verbatim in the tables, so they keep float64.
+CSV_DTYPES = {'USDNotional': 'float32', 'PnLUSD': 'float32', 'EntryPrice': 'float64', 'LastPrice': 'float64'}
+
+
+def read_trades_csv():
+    try:
+        df = pd.read_csv(CSV_FILE, engine='pyarrow', dtype=CSV_DTYPES)
+    except (ImportError, ValueError):
+        df = pd.read_csv(CSV_FILE, dtype=CSV_DTYPES)
+    if 'Quantity' in df.columns:
+        # Integer-valued quantities become a small int type; fractional ones stay float
+        df['Quantity'] = pd.to_numeric(df['Quantity'], downcast='integer')
+    return df
+
+
 def load_and_process_data():
     if not os.path.exists(CSV_FILE):
         return pd.DataFrame(), pd.DataFrame(), 0, 0, 0, 0, {}
 
-    df = pd.read_csv(CSV_FILE)
+    df = read_trades_csv()
 
-    required_cols = ['Ticker', 'Direction', 'Status', 'USDNotional', 'PnLUSD', 'EntryDate', 'EntryPrice', 'Quantity',
-                     'Notes', 'LastPrice']
-    for col in required_cols:
-        if col not in df.columns:
-            df[col] = 0 if col in ['USDNotional', 'PnLUSD', 'EntryPrice', 'Quantity', 'LastPrice'] else ""
+    existing = set(df.columns)
+    missing = [c for c in REQUIRED_COLS if c not in existing]
+    if missing:
+        df = df.assign(**{c: 0 if c in NUMERIC_COLS else "" for c in missing})
 
-    active_df = df[df['Status'].str.upper() == 'OPEN'].copy()
-    closed_df = df[df['Status'].str.upper() == 'CLOSED'].copy()
+    status_up = df['Status'].astype(str).str.upper().values
+    active_df = df.loc[status_up == 'OPEN'].copy()
+    closed_df = df.loc[status_up == 'CLOSED'].copy()
 
     # --- Active Stats ---
-    active_df['Weight %'] = (active_df['USDNotional'] / TOTAL_CAPITAL_USD) * 100
-    gross_exposure = active_df['USDNotional'].abs().sum()
+    notional = active_df['USDNotional'].to_numpy(dtype=np.float64)
+    abs_notional = np.abs(notional)
+    active_df['AbsNotional'] = abs_notional
+    active_df['Weight %'] = (notional / TOTAL_CAPITAL_USD) * 100
+    gross_exposure = np.nansum(abs_notional)  # NaN-skipping like Series.sum()
 
     # Net Exposure Logic
-    active_df['SignedNotional'] = active_df.apply(
-        lambda x: -abs(x['USDNotional']) if str(x['Direction']).upper() == 'SHORT' else abs(x['USDNotional']),
-        axis=1
-    )
+    direction = active_df['Direction'].astype(str).str.upper()
+    active_df['SignedNotional'] = np.where(direction.values == 'SHORT', -abs_notional, abs_notional)
     net_exposure = active_df['SignedNotional'].sum()
 
     total_pnl = active_df['PnLUSD'].sum()
@@ -185,22 +253,24 @@ def calculate_performance_stats(df):
         return {'WinRate': 0, 'ProfitFactor': 0, 'AvgWin': 0, 'AvgLoss': 0, 'TradeCount': 0, 'TotalRealized': 0,
                 'Expectancy': 0}
 
-    pnl = df['PnLUSD']
-    winners = pnl[pnl > 0]
-    losers = pnl[pnl <= 0]
+    pnl = df['PnLUSD'].to_numpy(dtype=np.float64)
+    # Blank PnL cells fail both masks, so they stay out of every total (as with Series.sum())
+    winners = pnl > 0
+    losers = pnl <= 0
 
     count = len(pnl)
-    win_count = len(winners)
+    win_count = int(winners.sum())
+    loss_count = int(losers.sum())
 
     win_rate = (win_count / count) * 100 if count > 0 else 0
-    total_realized = pnl.sum()
-
-    gross_profit = winners.sum()
-    gross_loss = abs(losers.sum())
+    gross_profit = pnl[winners].sum()
+    loss_sum = pnl[losers].sum()
+    total_realized = gross_profit + loss_sum
+    gross_loss = -loss_sum
 
     pf = (gross_profit / gross_loss) if gross_loss > 0 else float('inf')
-    avg_win = winners.mean() if win_count > 0 else 0
-    avg_loss = losers.mean() if len(losers) > 0 else 0
+    avg_win = gross_profit / win_count if win_count > 0 else 0
+    avg_loss = loss_sum / loss_count if loss_count > 0 else 0
     expectancy = total_realized / count if count > 0 else 0
 
     return {
@@ -217,82 +287,93 @@ def calculate_performance_stats(df):
 # ==========================================
 # 4. Chart Generation (ONE CHART / ABSOLUTE OVERLAY)
 # ==========================================
+def typed_array(values):
+    # Plotly.js typed-array spec: base64 float32 instead of a JSON number list
+    arr = np.ascontiguousarray(values, dtype=np.float32)
+    return {'dtype': 'f4', 'bdata': base64.b64encode(arr.tobytes()).decode('ascii')}
+
+
 def generate_allocation_chart(df):
     if df.empty:
-        return "<div style='text-align:center; padding:20px; color:#64748b;'>No Active Positions</div>"
+        return EMPTY_CHART
 
     # Sort by Absolute Exposure Magnitude (Largest positions on top/bottom)
-    df_sorted = df.sort_values(by='USDNotional', ascending=True)
+    # Only the chart columns are reordered, via an argsort of the notional key
+    usd = df['USDNotional'].to_numpy(dtype=np.float32)
+    order = np.argsort(usd)
 
-    tickers = df_sorted['Ticker'].tolist()
+    tickers = df['Ticker'].to_numpy()[order].tolist()
 
     # 1. Prepare Data for Absolute Magnitude Plotting
     # We plot everything as positive bars so they "stack/overlay" nicely
-    abs_exposures = df_sorted['USDNotional'].abs().tolist()
-    abs_pnls = df_sorted['PnLUSD'].abs().tolist()
+    real_pnls = df['PnLUSD'].to_numpy(dtype=np.float32)[order]
+    abs_exposures = df['AbsNotional'].to_numpy(dtype=np.float32)[order]
+    abs_pnls = np.abs(real_pnls)
 
     # 2. Real Values for Hover Text
-    real_exposures = df_sorted['SignedNotional'].tolist()
-    real_pnls = df_sorted['PnLUSD'].tolist()
+    real_exposures = df['SignedNotional'].to_numpy(dtype=np.float32)[order]
 
     # 3. Colors
     # Exposure: Blue for Long, Purple for Short (Purple implies Short without meaning 'Loss')
-    colors_exp = ['#3b82f6' if x >= 0 else '#a855f7' for x in real_exposures]
+    colors_exp = np.where(real_exposures >= 0, '#3b82f6', '#a855f7').tolist()
 
     # PnL: Green for Profit, Red for Loss
-    colors_pnl = ['#10B981' if x >= 0 else '#F43F5E' for x in real_pnls]
-
-    fig = go.Figure()
-
-    # Trace 1: Exposure (The "Container" Bar) - Plotted First
-    fig.add_trace(go.Bar(
-        y=tickers,
-        x=abs_exposures,
-        orientation='h',
-        name='Position Size',
-        marker=dict(color=colors_exp, line=dict(width=0)),
-        # Custom Hover to show real signed values
-        hovertemplate='<b>%{y}</b><br>Size: %{customdata:$,.0f}<extra></extra>',
-        customdata=real_exposures
-    ))
-
-    # Trace 2: PnL (The "Inner" Bar) - Plotted Second (On Top)
-    fig.add_trace(go.Bar(
-        y=tickers,
-        x=abs_pnls,
-        orientation='h',
-        name='PnL',
-        marker=dict(color=colors_pnl, line=dict(width=0)),
-        # Custom Hover to show real signed PnL
-        hovertemplate='<b>%{y}</b><br>PnL: %{customdata:+$,.0f}<extra></extra>',
-        customdata=real_pnls,
-        # Narrower bar to make it look like it's "inside"
-        width=0.5
-    ))
+    colors_pnl = np.where(real_pnls >= 0, '#10B981', '#F43F5E').tolist()
 
     chart_height = max(350, len(tickers) * 45)
 
-    fig.update_layout(
-        title="Portfolio Exposure (Bar) vs PnL (Inner)",
-        title_font=dict(size=14, color="#e2e8f0"),
-        barmode='overlay',  # Key: Allows bars to sit on top of each other
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        margin=dict(l=0, r=0, t=40, b=0),
-        height=chart_height,
-        showlegend=False,
-        font=dict(family="Inter, sans-serif", color="#94a3b8"),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(255,255,255,0.1)',
-            zeroline=False,
-            tickprefix="$",
-            title="Value (Absolute Magnitude)"
-        ),
-        yaxis=dict(showgrid=False, tickfont=dict(color="#e2e8f0", size=13, weight="bold"))
-    )
-
-    return pio.to_html(fig, full_html=False, include_plotlyjs='cdn')
+    # Plain figure dict: skips plotly's per-property validators
+    fig = {
+        'data': [
+            # Trace 1: Exposure (The "Container" Bar) - Plotted First
+            {
+                'type': 'bar',
+                'y': tickers,
+                'x': typed_array(abs_exposures),
+                'orientation': 'h',
+                'name': 'Position Size',
+                'marker': {'color': colors_exp, 'line': {'width': 0}},
+                # Custom Hover to show real signed values
+                'hovertemplate': '<b>%{y}</b><br>Size: %{customdata:$,.0f}<extra></extra>',
+                'customdata': typed_array(real_exposures)
+            },
+            # Trace 2: PnL (The "Inner" Bar) - Plotted Second (On Top)
+            {
+                'type': 'bar',
+                'y': tickers,
+                'x': typed_array(abs_pnls),
+                'orientation': 'h',
+                'name': 'PnL',
+                'marker': {'color': colors_pnl, 'line': {'width': 0}},
+                # Custom Hover to show real signed PnL
+                'hovertemplate': '<b>%{y}</b><br>PnL: %{customdata:+$,.0f}<extra></extra>',
+                'customdata': typed_array(real_pnls),
+                # Narrower bar to make it look like it's "inside"
+                'width': 0.5
+            }
+        ],
+        'layout': {
+            'title': {'text': "Portfolio Exposure (Bar) vs PnL (Inner)", 'font': {'size': 14, 'color': "#e2e8f0"}},
+            'barmode': 'overlay',  # Key: Allows bars to sit on top of each other
+            'paper_bgcolor': 'rgba(0,0,0,0)',
+            'plot_bgcolor': 'rgba(0,0,0,0)',
+            'margin': {'l': 0, 'r': 0, 't': 40, 'b': 0},
+            'height': chart_height,
+            'showlegend': False,
+            'font': {'family': "Inter, sans-serif", 'color': "#94a3b8"},
+            'xaxis': {
+                'showgrid': True,
+                'gridcolor': 'rgba(255,255,255,0.1)',
+                'zeroline': False,
+                'tickprefix': "$",
+                'title': {'text': "Value (Absolute Magnitude)"}
+            },
+            'yaxis': {'showgrid': False, 'tickfont': {'color': "#e2e8f0", 'size': 13, 'weight': "bold"}}
+        }
+    }
+
+    # plotly.js itself is loaded once from HTML_HEAD
+    return pio.to_html(fig, full_html=False, include_plotlyjs=False, validate=False)
 
 
 # ==========================================
@@ -303,6 +384,7 @@ HTML_HEAD = """
 <html>
 <head>
 <meta charset="utf-8">
+<script src="https://cdn.plot.ly/plotly-2.35.2.min.js" charset="utf-8"></script>
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&family=Roboto+Mono:wght@400;500;700&display=swap');
     :root { --bg-color: #0b0e11; --panel-bg: #151a21; --border-color: #2a2e39; --text-main: #e2e8f0; --text-muted: #64748b; --accent: #3b82f6; --profit: #10B981; --loss: #F43F5E; --warning: #F59E0B; }
@@ -352,6 +434,35 @@ HTML_FOOTER = """
 </html>
 """
 
+# Pre-encoded once; generate_report writes these bytes as-is
+HTML_HEAD_B = HTML_HEAD.encode("utf-8")
+HTML_FOOTER_B = HTML_FOOTER.encode("utf-8")
+
+EMPTY_CHART = "<div style='text-align:center; padding:20px; color:#64748b;'>No Active Positions</div>"
+EMPTY_ACTIVE_ROW = '<tr><td colspan="8" style="text-align:center; padding:30px;">No active positions.</td></tr>'
+EMPTY_CLOSED_ROW = '<tr><td colspan="5" style="text-align:center; padding:30px;">No closed trades history found.</td></tr>'
+
+ACTIVE_ROW_TMPL = """
+            <tr>
+                <td>{ticker} <span class="badge {badge}">{dir_char}</span></td>
+                <td>{entry_date} @ {entry_price}</td>
+                <td style="color:#fff;">{last_price}</td>
+                <td>{qty}</td>
+                <td style="color:{notional_color}">{notional}</td>
+                <td>{weight} {risk_alert}</td>
+                <td class="{pnl_class}">{pnl}</td>
+                <td style="text-align:left; color:#64748b; font-size:0.8rem;">{notes}</td>
+            </tr>"""
+
+CLOSED_ROW_TMPL = """
+            <tr>
+                <td>{ticker}</td>
+                <td>{entry_date}</td>
+                <td>{last_price}</td>
+                <td class="{pnl_class}">{pnl}</td>
+                <td style="text-align:left; color:#64748b;">{notes}</td>
+            </tr>"""
+
 
 # ==========================================
 # 6. Report Generation
@@ -361,8 +472,7 @@ def generate_report():
     active_df, closed_df, gross_exp, net_exp, total_pnl, cash, stats = load_and_process_data()
     nav = TOTAL_CAPITAL_USD + total_pnl
 
-    html = HTML_HEAD
-    html += f"""
+    parts = [f"""
     <div class="container">
         <div class="header-flex">
             <div>
@@ -429,61 +539,66 @@ def generate_report():
                         <tr><th>Ticker</th><th>Entry</th><th>Last</th><th>Qty</th><th>Net Notional</th><th>Weight</th><th>Unrealized P&L</th><th>Note</th></tr>
                     </thead>
                     <tbody>
-    """
+    """]
 
     if active_df.empty:
-        html += '<tr><td colspan="8" style="text-align:center; padding:30px;">No active positions.</td></tr>'
+        parts.append(EMPTY_ACTIVE_ROW)
     else:
-        for _, row in active_df.iterrows():
-            is_long = str(row['Direction']).upper() == 'LONG'
+        # Display strings are formatted column-wise before the row loop
+        direction = active_df['Direction'].astype(str)
+        active_df['IsLong'] = direction.str.upper().eq('LONG').to_numpy()
+        active_df['DirChar'] = direction.str[0]
+        is_long_mask = active_df['IsLong'].to_numpy()
+        signed = active_df['SignedNotional']
+        fmt = pd.DataFrame({
+            'QtyStr': active_df['Quantity'].map('{:,}'.format),
+            'NotionalStr': np.where(is_long_mask, signed.map('${:,.0f}'.format), signed.abs().map('-${:,.0f}'.format)),
+            'WeightStr': active_df['Weight %'].map('{:.1f}%'.format),
+            'PnLStr': active_df['PnLUSD'].map('${:+,.0f}'.format),
+        }, index=active_df.index)
+        cols = pd.concat([active_df[['Ticker', 'DirChar', 'IsLong', 'EntryDate', 'EntryPrice', 'LastPrice',
+                                     'Weight %', 'PnLUSD', 'Notes']], fmt], axis=1)
+        for (ticker, dir_char, is_long, entry_date, entry_price, last_price, weight, pnl, notes,
+             qty_str, notional_str, weight_str, pnl_str) in cols.itertuples(index=False, name=None):
             badge = "badge-long" if is_long else "badge-short"
-            pnl_class = "text-profit" if row['PnLUSD'] >= 0 else "text-loss"
-            signed_notional = row['SignedNotional']
-            weight = row['Weight %']
+            pnl_class = "text-profit" if pnl >= 0 else "text-loss"
             risk_alert = '<span class="risk-alert">⚠️ High Conc.</span>' if weight > 20 else ""
-            notional_str = f"${signed_notional:,.0f}" if is_long else f"-${abs(signed_notional):,.0f}"
 
-            html += f"""
-            <tr>
-                <td>{row['Ticker']} <span class="badge {badge}">{row['Direction'][0]}</span></td>
-                <td>{row['EntryDate']} @ {row['EntryPrice']}</td>
-                <td style="color:#fff;">{row['LastPrice']}</td>
-                <td>{row['Quantity']:,}</td>
-                <td style="color:{'#e2e8f0' if is_long else '#ef4444'}">{notional_str}</td>
-                <td>{weight:.1f}% {risk_alert}</td>
-                <td class="{pnl_class}">${row['PnLUSD']:+,.0f}</td>
-                <td style="text-align:left; color:#64748b; font-size:0.8rem;">{row['Notes']}</td>
-            </tr>"""
+            parts.append(ACTIVE_ROW_TMPL.format_map({
+                'ticker': ticker, 'badge': badge, 'dir_char': dir_char,
+                'entry_date': entry_date, 'entry_price': entry_price, 'last_price': last_price,
+                'qty': qty_str, 'notional_color': '#e2e8f0' if is_long else '#ef4444', 'notional': notional_str,
+                'weight': weight_str, 'risk_alert': risk_alert, 'pnl_class': pnl_class, 'pnl': pnl_str,
+                'notes': notes
+            }))
 
-    html += """</tbody></table></div></div>"""
+    parts.append("""</tbody></table></div></div>""")
 
-    html += """
+    parts.append("""
         <div id="past-trades" class="tab-content hidden">
             <div class="table-responsive">
                 <table>
                     <thead><tr><th>Ticker</th><th>Entry</th><th>Exit Price</th><th>Realized P&L</th><th>Note</th></tr></thead>
                     <tbody>
-    """
+    """)
 
     if closed_df.empty:
-        html += '<tr><td colspan="5" style="text-align:center; padding:30px;">No closed trades history found.</td></tr>'
+        parts.append(EMPTY_CLOSED_ROW)
     else:
-        for _, row in closed_df.iterrows():
-            pnl_class = "text-profit" if row['PnLUSD'] >= 0 else "text-loss"
-            html += f"""
-            <tr>
-                <td>{row['Ticker']}</td>
-                <td>{row['EntryDate']}</td>
-                <td>{row['LastPrice']}</td>
-                <td class="{pnl_class}">${row['PnLUSD']:+,.0f}</td>
-                <td style="text-align:left; color:#64748b;">{row['Notes']}</td>
-            </tr>"""
-
-    html += """</tbody></table></div></div></div>"""
-    html += HTML_FOOTER
-
-    with open(OUTPUT_HTML, "w", encoding="utf-8") as f:
-        f.write(html)
+        cols = closed_df[['Ticker', 'EntryDate', 'LastPrice', 'PnLUSD', 'Notes']].assign(
+            PnLStr=closed_df['PnLUSD'].map('${:+,.0f}'.format))
+        parts.extend(CLOSED_ROW_TMPL.format_map({
+            'ticker': ticker, 'entry_date': entry_date, 'last_price': last_price,
+            'pnl_class': 'text-profit' if pnl >= 0 else 'text-loss', 'pnl': pnl_str, 'notes': notes
+        }) for ticker, entry_date, last_price, pnl, notes, pnl_str in cols.itertuples(index=False, name=None))
+
+    parts.append("""</tbody></table></div></div></div>""")
+
+    data = "".join(parts).encode("utf-8")
+    with open(OUTPUT_HTML, "wb", buffering=1024 * 1024) as f:
+        f.write(HTML_HEAD_B)
+        f.write(data)
+        f.write(HTML_FOOTER_B)
     print(f"[Success] Report generated: {OUTPUT_HTML}")
 
 
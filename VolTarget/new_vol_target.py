@@ -1,20 +1,293 @@
 import yfinance as yf
+import numpy as np
 import pandas as pd
+import argparse
+import asyncio
+import base64
+import importlib.util
 import json
 import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
 
 # --- 設定基礎路徑 ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 INPUT_FILE = os.path.join(BASE_DIR, "stock_list.csv")
 OUTPUT_HTML = os.path.join(BASE_DIR, "vol_tool.html")
 
+# --- 下載設定 ---
+BATCH_SIZE = 20
+DOWNLOAD_WORKERS = 4  # 同時下載的批次數量
+HISTORY_DAYS = 730  # 2y
+CHART_URL = "https://query2.finance.yahoo.com/v8/finance/chart/{ticker}"
+HTTP_CONCURRENCY = 16  # 共用一個連線池，同時最多 16 個請求
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# --- 本地快取 (每檔股票一個 parquet，只下載新增的日子) ---
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")
+CACHE_TTL = 3600  # 1 小時內重跑直接用快取，不再下載
+CACHE_AVAILABLE = any(importlib.util.find_spec(m) is not None for m in ("pyarrow", "fastparquet"))
+
+# --- 波動率設定 ---
+VOL_WINDOWS = (20, 60, 252)  # 對應頁面上的 Lookback 選項
+
 
 # --- 1. DATA FETCHING FUNCTION ---
-def fetch_market_data():
+def _cache_path(ticker):
+    return os.path.join(CACHE_DIR, f"{ticker}.parquet")
+
+
+def _load_cache(ticker):
+    """Cached Close series for ticker, or None."""
+    path = _cache_path(ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path).iloc[:, 0]
+    except Exception as e:
+        print(f"Cache read skipped for {ticker}: {e}")
+        return None
+
+
+def _save_cache(ticker, series):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        series.to_frame(ticker).to_parquet(_cache_path(ticker))
+    except Exception as e:
+        print(f"Cache write skipped for {ticker}: {e}")
+
+
+def _download_batch(batch, start):
+    """
+    Downloads one batch of tickers from start and returns its Close prices (or None).
+    """
+    # 每個 worker 隨機錯開請求，取代全局延遲，避免被封鎖 IP
+    time.sleep(random.uniform(0.2, 0.5))
+    print(f"Downloading batch: {batch}")
+
+    try:
+        # 下載該批次
+        data = yf.download(
+            batch,
+            start=start,
+            group_by='ticker',
+            auto_adjust=True,
+            progress=False,
+            threads=True
+        )
+
+        if data.empty:
+            print("  -> Batch returned empty.")
+            return None
+
+        # 提取 Close 價格
+        # 情況 A: 單一股票 (Columns 不是 MultiIndex 或只有一層)
+        if len(batch) == 1 and not isinstance(data.columns, pd.MultiIndex):
+            # yfinance 單一股票下載時結構較簡單
+            if 'Close' in data.columns:
+                df_close = data[['Close']].rename(columns={'Close': batch[0]})
+                return df_close
+
+        # 情況 B: 多檔股票 (MultiIndex: Ticker -> Price 或 Price -> Ticker)
+        else:
+            # 嘗試標準提取
+            try:
+                # 如果 columns 是 (Price, Ticker)，我們取 'Close'
+                # yfinance 最近版本通常是 (Price, Ticker) 結構
+                # 但有時 group_by='ticker' 會變成 (Ticker, Price)
+                # 最穩健的方法是檢查層級
+
+                if isinstance(data.columns, pd.MultiIndex):
+                    # 檢查 'Close' 在哪一層
+                    if 'Close' in data.columns.get_level_values(0):
+                        # 結構: Close -> Ticker
+                        df_close = data['Close']
+                    elif 'Close' in data.columns.get_level_values(1):
+                        # 結構: Ticker -> Close
+                        df_close = data.xs('Close', level=1, axis=1)
+                    else:
+                        print("  -> 'Close' column not found in MultiIndex.")
+                        return None
+                else:
+                    # 只有一層 columns (極少見，除非只下載成功一檔)
+                    if 'Close' in data.columns:
+                        df_close = data[['Close']]
+                    else:
+                        return None
+
+                return df_close
+
+            except Exception as e:
+                print(f"  -> Error extracting data from batch: {e}")
+
+    except Exception as e:
+        print(f"  -> Batch download failed: {e}")
+
+    return None
+
+
+if njit is not None:
+    # 每檔股票一個 prange 迭代，用滾動 sum / sum of squares 一次過算出整條波動率
+    # fastmath 不包含 nnan，否則 isnan 檢查會被編譯器優化掉
+    @njit(parallel=True, fastmath={"reassoc", "contract", "arcp"}, cache=True)
+    def _rolling_vol_2d(prices, window, out):
+        n, t = prices.shape
+        sqrt252 = np.sqrt(252.0)
+        for j in prange(t):
+            buf = np.empty(window)
+            k = 0
+            s = 0.0
+            ss = 0.0
+            prev = np.nan
+            for i in range(n):
+                out[i, j] = np.nan
+                p = prices[i, j]
+                if np.isnan(p):
+                    continue
+                if np.isnan(prev):
+                    prev = p
+                    continue
+                r = np.log(p / prev) if p > 0 and prev > 0 else 0.0
+                prev = p
+                slot = k % window
+                if k >= window:
+                    old = buf[slot]
+                    s -= old
+                    ss -= old * old
+                buf[slot] = r
+                s += r
+                ss += r * r
+                k += 1
+                if k >= window:
+                    out[i, j] = np.sqrt(max(ss - s * s / window, 0.0) / (window - 1)) * sqrt252
+
+
+def compute_rolling_vols(prices_df):
+    """
+    Annualised rolling vol of daily log returns for every ticker and window in VOL_WINDOWS.
+    Each ticker uses only its own trading days; vol is NaN until the window fills and on missing days.
+    Returns {window: array shaped like prices_df}.
+    """
+    values = prices_df.to_numpy(dtype=np.float64)
+
+    if njit is not None:
+        vols = {w: np.empty(values.shape) for w in VOL_WINDOWS}
+        for w, out in vols.items():
+            _rolling_vol_2d(values, w, out)
+        return vols
+
+    vols = {w: np.full(values.shape, np.nan) for w in VOL_WINDOWS}
+    sqrt252 = np.sqrt(252)
+
+    for j in range(values.shape[1]):
+        mask = ~np.isnan(values[:, j])
+        prices = values[mask, j]
+        if len(prices) < 2:
+            continue
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rets = np.log(prices[1:] / prices[:-1])
+        rets[(prices[1:] <= 0) | (prices[:-1] <= 0)] = 0.0
+        rows = np.flatnonzero(mask)[1:]
+
+        for w in VOL_WINDOWS:
+            if len(rets) < w:
+                continue
+            x = sliding_window_view(rets, w)
+            vol = np.sqrt(((x - x.mean(-1, keepdims=True)) ** 2).sum(-1) / (w - 1)) * sqrt252
+            vols[w][rows[w - 1:], j] = vol
+
+    return vols
+
+
+def _float32_b64(values):
+    """Base64 of a (dates x tickers) array as little-endian float32, one ticker after another."""
+    return base64.b64encode(np.asarray(values, dtype='<f4').tobytes(order='F')).decode('ascii')
+
+
+async def _fetch_chart(client, sem, ticker, start):
+    """Adjusted closes for one ticker from Yahoo's chart API, or None on any failure."""
+    params = {'period1': int(start.timestamp()), 'period2': int(time.time()), 'interval': '1d'}
+    try:
+        async with sem:
+            r = await client.get(CHART_URL.format(ticker=ticker), params=params)
+        r.raise_for_status()
+        result = r.json()['chart']['result'][0]
+        # 時間戳記是開市時間 (UTC)，加上交易所時差後取日期
+        times = np.asarray(result['timestamp'], dtype=np.int64) + result['meta'].get('gmtoffset', 0)
+        closes = np.array(result['indicators']['adjclose'][0]['adjclose'], dtype=np.float32)
+    except Exception:
+        return None
+    series = pd.Series(closes, index=pd.to_datetime(times, unit='s').normalize(), name=ticker)
+    return series[~series.index.duplicated(keep='last')]
+
+
+async def _fetch_charts(jobs):
+    """{ticker: series} for every (ticker, start) job that the chart API answered."""
+    sem = asyncio.Semaphore(HTTP_CONCURRENCY)
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    async with httpx.AsyncClient(http2=HTTP2_AVAILABLE, timeout=15.0, headers=headers) as client:
+        results = await asyncio.gather(*(_fetch_chart(client, sem, t, start) for t, start in jobs))
+    return {t: series for (t, _), series in zip(jobs, results) if series is not None}
+
+
+def _download_closes(starts):
+    """
+    {ticker: close series} for {ticker: start date}: chart API first, yfinance batches for the rest.
+    """
+    groups = {}  # start date -> tickers
+    for t, start in starts.items():
+        groups.setdefault(start, []).append(t)
+
+    # 先用 chart API 非同步下載所有股票，失敗的再交給 yfinance 分批下載
+    downloaded = {}
+    if httpx is not None and groups:
+        try:
+            downloaded = asyncio.run(_fetch_charts(list(starts.items())))
+            print(f"Chart API returned {len(downloaded)} tickers.")
+        except Exception as e:
+            print(f"Chart API download failed ({e}), falling back to yfinance.")
+        groups = {start: missing for start, group in groups.items()
+                  if (missing := [t for t in group if t not in downloaded])}
+
+    # Download Data in Batches (避免 Timeout)，多個批次同時下載
+    batches = [(group[i: i + BATCH_SIZE], start)
+               for start, group in groups.items()
+               for i in range(0, len(group), BATCH_SIZE)]
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        futures = [executor.submit(_download_batch, batch, start) for batch, start in batches]
+        for future in as_completed(futures):
+            df_close = future.result()
+            if df_close is not None:
+                # 與 chart API 一致用 float32，合併、快取檔及輸出都只需一半空間
+                downloaded.update(df_close.astype(np.float32).items())
+    return downloaded
+
+
+def fetch_market_data(force=False):
     """
     Reads tickers, downloads 2y history in batches, and returns a clean JSON string.
+    Cached tickers only download from their second-to-last cached date; force ignores the cache.
     """
     print("--- Starting Data Download ---")
 
@@ -24,121 +297,116 @@ def fetch_market_data():
         tickers = ['SPY', 'QQQ', 'IWM', 'AAPL', 'MSFT', 'NVDA', 'TSLA', 'GOOGL', 'AMZN']
     else:
         try:
-            df = pd.read_csv(INPUT_FILE)
-            # 讀取第一欄，去除空白，轉大寫
-            raw_tickers = df.iloc[:, 0].astype(str).str.strip().str.upper().tolist()
-            # 過濾無效值並修正符號 (例如 BRK/A -> BRK-A)
-            tickers = [t.replace('/', '-') for t in raw_tickers if t and t != 'NAN']
-            # 去除重複
-            tickers = list(set(tickers))
+            # 只讀取第一欄並當作字串，不解析其他欄位；空格保持為空字串
+            if pa is not None:
+                table = pacsv.read_csv(
+                    INPUT_FILE,
+                    read_options=pacsv.ReadOptions(autogenerate_column_names=True, skip_rows=1),
+                    convert_options=pacsv.ConvertOptions(include_columns=['f0'], column_types={'f0': pa.string()}),
+                )
+                raw_tickers = pc.utf8_upper(pc.utf8_trim_whitespace(table.column(0))).to_pylist()
+            else:
+                df = pd.read_csv(INPUT_FILE, usecols=[0], dtype=str, engine='c', na_filter=False)
+                raw_tickers = df.iloc[:, 0].str.strip().str.upper()
+            # 過濾空值並修正符號 (例如 BRK/A -> BRK-A)；dict.fromkeys 一次過去除重複，並保留原本次序
+            tickers = list(dict.fromkeys(t.replace('/', '-') for t in raw_tickers if t))
         except Exception as e:
             print(f"Error reading csv: {e}")
             return None
 
     print(f"Total tickers to fetch: {len(tickers)}")
 
-    # 2. Download Data in Batches (避免 Timeout)
-    BATCH_SIZE = 20
-    all_data_frames = []
-
-    for i in range(0, len(tickers), BATCH_SIZE):
-        batch = tickers[i: i + BATCH_SIZE]
-        print(f"Downloading batch {i // BATCH_SIZE + 1}: {batch}")
-
-        try:
-            # 下載該批次
-            data = yf.download(
-                batch,
-                period="2y",
-                group_by='ticker',
-                auto_adjust=True,
-                progress=False,
-                threads=True
-            )
-
-            if data.empty:
-                print("  -> Batch returned empty.")
+    # 2. 讀取快取，決定每檔股票要從哪一天開始下載
+    today = pd.Timestamp.today().normalize()
+    history_start = today - timedelta(days=HISTORY_DAYS)
+    now = time.time()
+    cached = {}
+    starts = {}  # ticker -> start date
+    for t in tickers:
+        series = None if force or not CACHE_AVAILABLE else _load_cache(t)
+        if series is not None and not series.empty:
+            cached[t] = series
+            if now - os.path.getmtime(_cache_path(t)) < CACHE_TTL:
                 continue
-
-            # 提取 Close 價格
-            # 情況 A: 單一股票 (Columns 不是 MultiIndex 或只有一層)
-            if len(batch) == 1:
-                # yfinance 單一股票下載時結構較簡單
-                if 'Close' in data.columns:
-                    df_close = data[['Close']].rename(columns={'Close': batch[0]})
-                    all_data_frames.append(df_close)
-
-            # 情況 B: 多檔股票 (MultiIndex: Ticker -> Price 或 Price -> Ticker)
-            else:
-                # 嘗試標準提取
-                try:
-                    # 如果 columns 是 (Price, Ticker)，我們取 'Close'
-                    # yfinance 最近版本通常是 (Price, Ticker) 結構
-                    # 但有時 group_by='ticker' 會變成 (Ticker, Price)
-                    # 最穩健的方法是檢查層級
-
-                    if isinstance(data.columns, pd.MultiIndex):
-                        # 檢查 'Close' 在哪一層
-                        if 'Close' in data.columns.get_level_values(0):
-                            # 結構: Close -> Ticker
-                            df_close = data['Close']
-                        elif 'Close' in data.columns.get_level_values(1):
-                            # 結構: Ticker -> Close
-                            df_close = data.xs('Close', level=1, axis=1)
-                        else:
-                            print("  -> 'Close' column not found in MultiIndex.")
-                            continue
-                    else:
-                        # 只有一層 columns (極少見，除非只下載成功一檔)
-                        if 'Close' in data.columns:
-                            df_close = data[['Close']]
-                        else:
-                            continue
-
-                    all_data_frames.append(df_close)
-
-                except Exception as e:
-                    print(f"  -> Error extracting data from batch: {e}")
-
-        except Exception as e:
-            print(f"  -> Batch download failed: {e}")
-
-        # 禮貌性延遲，避免被封鎖 IP
-        time.sleep(1)
-
-    if not all_data_frames:
+            # 從快取倒數第二天開始下載 (最後一天可能是盤中價)，用重疊的那一天檢查有沒有重新調整
+            starts[t] = series.index[max(len(series) - 2, 0)].normalize()
+        else:
+            starts[t] = history_start
+
+    print(f"Cached tickers: {len(cached)}, tickers to download: {len(starts)}")
+
+    # 3. 只下載新增的日子；若重疊日的收市價不同 (拆股 / 派息後 Yahoo 重新調整了整段歷史)，
+    #    或者這檔股票沒有下載到，就整段重新下載，避免新舊價格基準不同而產生假的回報
+    downloaded = _download_closes(starts)
+    rebased = []
+    for t, start in starts.items():
+        old = cached.get(t)
+        if old is None:
+            continue
+        new = downloaded.get(t)
+        if (new is None or start not in new.index or start not in old.index
+                or not np.isclose(new[start], old[start], rtol=1e-4, atol=0)):
+            rebased.append(t)
+            downloaded.pop(t, None)
+    if rebased:
+        print(f"Re-downloading {len(rebased)} re-adjusted or missing tickers in full...")
+        downloaded.update(_download_closes(dict.fromkeys(rebased, history_start)))
+
+    # 合併快取與新資料，並寫回快取；沒有下載到的股票保留原本快取
+    for t, new in downloaded.items():
+        new = new.dropna()
+        if new.empty:
+            continue
+        old = cached.get(t)
+        if old is not None and t not in rebased:
+            new = pd.concat([old, new])
+            new = new[~new.index.duplicated(keep='last')]
+        new = new[new.index >= history_start]
+        cached[t] = new
+        if CACHE_AVAILABLE:
+            _save_cache(t, new)
+
+    all_series = {t: series[series.index >= history_start] for t, series in cached.items()}
+
+    if not all_series:
         print("Error: No data fetched successfully.")
         return None
 
-    # 3. 合併所有批次資料
+    # 4. 合併所有批次資料: 預先分配一個 float32 陣列，逐檔寫入對應欄位，避免 pd.concat 反覆對齊索引
     print("Merging data...")
     try:
-        final_df = pd.concat(all_data_frames, axis=1)
-        # 刪除重複的欄位 (以防萬一)
-        final_df = final_df.loc[:, ~final_df.columns.duplicated()]
+        master_index = pd.DatetimeIndex(np.unique(np.concatenate([s.index.values for s in all_series.values()])))
+        closes = np.full((len(master_index), len(all_series)), np.nan, dtype=np.float32)
+        for col, series in enumerate(all_series.values()):
+            closes[master_index.get_indexer(series.index), col] = series.to_numpy()
+        np.round(closes, 2, out=closes)  # 價格保留兩位小數，原地處理不另複製
+        final_df = pd.DataFrame(closes, index=master_index, columns=list(all_series))
     except Exception as e:
         print(f"Merge failed: {e}")
         return None
 
-    # 4. 清理資料
+    # 5. 清理資料
     final_df.dropna(how='all', inplace=True)  # 刪除完全沒資料的日期
-    final_df = final_df.round(2)
+    final_df.dropna(axis=1, how='all', inplace=True)  # 不內嵌完全沒資料的股票
 
-    # 處理索引
-    final_df.index.name = 'Date'
-    final_df.reset_index(inplace=True)
-    final_df['Date'] = final_df['Date'].dt.strftime('%Y-%m-%d')
+    # 預先計算各回測週期的波動率，頁面只需查表
+    print("Computing rolling volatility...")
+    vols = compute_rolling_vols(final_df)
 
-    # 轉為 JSON
-    json_data = final_df.to_json(orient='records')
+    # 轉為 JSON (欄式): 日期與代號各一份清單，價格與波動率為 base64 Float32 (按股票排列)
+    json_data = json.dumps({
+        "dates": final_df.index.strftime('%Y-%m-%d').tolist(),
+        "tickers": final_df.columns.tolist(),
+        "closes": _float32_b64(final_df.to_numpy()),
+        "vols": {str(w): _float32_b64(v) for w, v in vols.items()},
+    })
 
-    print(f"--- Data Download Complete. Rows: {len(final_df)}, Columns: {len(final_df.columns)} ---")
+    print(f"--- Data Download Complete. Rows: {len(final_df)}, Tickers: {len(final_df.columns)} ---")
     return json_data
 
 
 # --- 2. HTML GENERATION ---
-def generate_html(json_data):
-    html_template = """
+HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="zh-HK">
 <head>
@@ -146,7 +414,8 @@ def generate_html(json_data):
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Vol Target Calculator</title>
     <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+    <link href="https://cdn.jsdelivr.net/npm/uplot@1/dist/uPlot.min.css" rel="stylesheet">
+    <script src="https://cdn.jsdelivr.net/npm/uplot@1/dist/uPlot.iife.min.js"></script>
 
     <style>
         body { background-color: #f8f9fa; padding-top: 40px; padding-bottom: 60px; font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; }
@@ -325,45 +594,30 @@ def generate_html(json_data):
     // --- DATA INJECTION POINT ---
     const marketData = {{DATA_INJECTION}};
 
-    window.onload = function() {
-        if(marketData && marketData.length > 0) {
-            const lastRow = marketData[marketData.length - 1];
-            document.getElementById('updateDate').innerText = lastRow.Date;
-            document.getElementById('tickerHint').innerText = "Database loaded. Ready to calculate.";
-        }
-    };
-
-    function calculateReturns(prices) {
-        let returns = [];
-        for (let i = 1; i < prices.length; i++) {
-            let p_t = prices[i];
-            let p_prev = prices[i-1];
-            if (p_t > 0 && p_prev > 0) {
-                returns.push(Math.log(p_t / p_prev));
-            } else {
-                returns.push(0); 
-            }
-        }
-        return returns;
+    // 價格與波動率以 Float32 按股票排列: ticker 第 col 欄的第 i 日 = array[col * N + i]，缺值為 NaN
+    function decodeFloat32(b64) {
+        const bin = atob(b64);
+        const bytes = new Uint8Array(bin.length);
+        for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+        return new Float32Array(bytes.buffer);
     }
 
-    function calculateRollingVol(returns, window) {
-        let vols = [];
-        const sqrt252 = Math.sqrt(252);
+    const N = marketData.dates.length;
+    const closes = decodeFloat32(marketData.closes);
+    const volData = {};
+    for (const w in marketData.vols) volData[w] = decodeFloat32(marketData.vols[w]);
+    // 代號在 Python 端已轉成大寫，直接作為 key
+    const tickerIndex = new Map(marketData.tickers.map((t, i) => [t, i]));
+    let chartTimes = null;
+    let volChart = null;
 
-        for (let i = 0; i < returns.length; i++) {
-            if (i < window - 1) {
-                vols.push(null); 
-                continue;
-            }
-            let slice = returns.slice(i - window + 1, i + 1);
-            let mean = slice.reduce((a, b) => a + b, 0) / slice.length;
-            let variance = slice.reduce((a, b) => a + Math.pow(b - mean, 2), 0) / (slice.length - 1);
-            let stdDev = Math.sqrt(variance);
-            vols.push(stdDev * sqrt252);
+    window.onload = function() {
+        chartTimes = marketData.dates.map(d => Date.parse(d) / 1000);
+        if(N > 0) {
+            document.getElementById('updateDate').innerText = marketData.dates[N - 1];
+            document.getElementById('tickerHint').innerText = "Database loaded. Ready to calculate.";
         }
-        return vols;
-    }
+    };
 
     function calculate() {
         document.getElementById('errorBox').classList.add('hidden');
@@ -374,35 +628,38 @@ def generate_html(json_data):
         const targetVol = parseFloat(document.getElementById('target_vol').value) / 100.0;
         const lookback = parseInt(document.getElementById('lookback').value);
 
-        let dates = [];
-        let prices = [];
-
-        if (marketData.length === 0) return;
+        if (N === 0) return;
 
-        let tickerKey = Object.keys(marketData[0]).find(k => k.toUpperCase() === ticker);
-
-        if (!tickerKey) {
-            showError(`Ticker '${ticker}' not found in database. Available tickers: ` + Object.keys(marketData[0]).filter(k => k !== 'Date').join(', '));
+        if (!tickerIndex.has(ticker)) {
+            showError(`Ticker '${ticker}' not found in database. Available tickers: ` + marketData.tickers.join(', '));
             return;
         }
-
-        for (let row of marketData) {
-            if (row[tickerKey] != null) {
-                dates.push(row.Date);
-                prices.push(row[tickerKey]);
+        const col = tickerIndex.get(ticker);
+
+        // 波動率已在伺服器端預先計算，與價格逐日對齊 (直接取該股票的連續區段)
+        const prices = closes.subarray(col * N, (col + 1) * N);
+        const volSeries = volData[lookback].subarray(col * N, (col + 1) * N);
+
+        // 一次掃描: 數有效日子、找最後一日，同時把波動率填入預先分配的圖表陣列 (NaN -> null)
+        const chartVols = new Array(N);
+        let days = 0;
+        let last = -1;
+        for (let i = 0; i < N; i++) {
+            const v = volSeries[i];
+            chartVols[i] = v === v ? v : null;
+            if (prices[i] === prices[i]) {
+                days++;
+                last = i;
             }
         }
 
-        if (prices.length < lookback + 2) {
-            showError(`Not enough data for ${ticker}. Found ${prices.length} days.`);
+        if (days < lookback + 2) {
+            showError(`Not enough data for ${ticker}. Found ${days} days.`);
             return;
         }
 
-        const returns = calculateReturns(prices);
-        const volSeries = calculateRollingVol(returns, lookback);
-
-        const currentPrice = prices[prices.length - 1];
-        const currentVol = volSeries[volSeries.length - 1];
+        const currentPrice = prices[last];
+        const currentVol = volSeries[last];
 
         if (currentVol == null || isNaN(currentVol)) {
             showError("Could not calculate volatility.");
@@ -433,27 +690,26 @@ def generate_html(json_data):
             document.getElementById('txtCashPct').innerText = (leverage * 100).toFixed(1);
         }
 
-        const chartDates = dates.slice(1); 
-        const trace = {
-            x: chartDates,
-            y: volSeries,
-            type: 'scatter',
-            mode: 'lines',
-            name: 'Volatility',
-            line: {color: '#0d6efd', width: 2}
-        };
+        // 先顯示結果卡，圖表才能取得容器寬度
+        document.getElementById('resultCard').classList.remove('hidden');
 
-        const layout = {
-            title: {text: `${ticker} Historical Volatility`, x: 0.01},
-            yaxis: {title: 'Annualized Vol', tickformat: '.0%'},
-            xaxis: {showgrid: false},
-            template: 'plotly_white',
+        const chartEl = document.getElementById('volChart');
+        if (volChart) volChart.destroy();
+        const opts = {
+            title: `${ticker} Historical Volatility`,
+            width: chartEl.clientWidth || 600,
             height: 300,
-            margin: {l: 40, r: 20, t: 50, b: 20}
+            legend: {show: false},
+            series: [
+                {},
+                {label: 'Volatility', stroke: '#0d6efd', width: 2, spanGaps: true}
+            ],
+            axes: [
+                {grid: {show: false}},
+                {label: 'Annualized Vol', values: (u, ticks) => ticks.map(v => (v * 100).toFixed(0) + '%')}
+            ]
         };
-
-        Plotly.newPlot('volChart', [trace], layout, {displayModeBar: false});
-        document.getElementById('resultCard').classList.remove('hidden');
+        volChart = new uPlot(opts, [chartTimes, chartVols], chartEl);
     }
 
     function showError(msg) {
@@ -467,21 +723,33 @@ def generate_html(json_data):
 </html>
     """
 
-    final_html = html_template.replace("{{DATA_INJECTION}}", json_data)
+# 模板只在載入時切開並編碼一次，寫檔時資料直接夾在中間，不用 replace 複製整份 HTML
+HTML_PREFIX_B, HTML_SUFFIX_B = (part.encode("utf-8") for part in HTML_TEMPLATE.split("{{DATA_INJECTION}}"))
+
 
+def generate_html(json_data):
     # [關鍵] 使用時間戳記檔名
     file_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_filename = f"vol_tool_{file_timestamp}.html"
     output_path = os.path.join(BASE_DIR, output_filename)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(final_html)
+    # 先寫到暫存檔再 os.replace，app 不會讀到寫了一半的檔案
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb", buffering=1 << 20) as f:
+        f.write(HTML_PREFIX_B)
+        f.write(json_data.encode("utf-8"))
+        f.write(HTML_SUFFIX_B)
+    os.replace(tmp_path, output_path)
 
     print(f"--- Success! Generated {output_path} ---")
 
 
 # --- MAIN EXECUTION ---
 if __name__ == "__main__":
-    data_json = fetch_market_data()
+    parser = argparse.ArgumentParser(description="Generate the Vol Target Calculator page.")
+    parser.add_argument("--force", action="store_true", help="ignore the local price cache and redownload everything")
+    args = parser.parse_args()
+
+    data_json = fetch_market_data(force=args.force)
     if data_json:
         generate_html(data_json)
\ No newline at end of file
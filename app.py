@@ -1,10 +1,26 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
 import streamlit.components.v1 as components
+import pandas as pd
+import base64
+import json
+import logging
 import os
 import sys
-import glob
+import fnmatch
+import gzip
+import re
+import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+try:
+    import minify_html
+except ImportError:
+    minify_html = None
 
 # ==========================================
 # 1. Page Configuration
@@ -19,7 +35,9 @@ st.set_page_config(
 # ==========================================
 # 2. Custom CSS (From your Old Version)
 # ==========================================
-st.markdown("""
+# Static chrome is kept in module constants and re-emitted on every rerun: Streamlit drops any element
+# a rerun does not emit, so a "render once per session" guard would strip the styling after the first click
+APP_CHROME = """
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&family=Roboto+Mono:wght@400;500;700&display=swap');
 
@@ -94,66 +112,334 @@ st.markdown("""
 
 <div class="fixed-bg"></div>
 <div class="fixed-blobs"></div>
-""", unsafe_allow_html=True)
+"""
+
+SIDEBAR_HEADER = """
+<div style='padding: 20px 0px; text-align: center; border-bottom: 1px solid #374151; margin-bottom: 20px;'>
+    <h2 style='color: #F3F4F6; margin:0; letter-spacing: 1px; font-weight: 700;'>Quant Research</h2>
+    <p style='color: #9CA3AF; font-size: 0.85em; margin-top:5px;'>Equity Strategy & Risk</p>
+</div>
+"""
+
+FOOTER = """
+<div class="custom-footer">
+    <p>
+        © 2026 Quantitative Research from Anson. All rights reserved.<br>
+        <span style="font-size: 0.75rem; color: #6B7280;">
+        Not financial advice · For informational and educational purposes only.
+        </span>
+    </p>
+</div>
+"""
+
+
+
+# The chrome goes out with every rerun, so its comments and indentation are stripped once per process
+@st.cache_resource
+def compact_markup(markup):
+    return re.sub(r'\s+', ' ', re.sub(r'/\*.*?\*/', '', markup, flags=re.S)).strip()
+
+
+st.markdown(compact_markup(APP_CHROME), unsafe_allow_html=True)
 
 
 # ==========================================
 # 3. Helper Functions
 # ==========================================
 
+# Paths are resolved once from the script location, so the app does not depend on the working directory
+BASE_DIR = Path(__file__).resolve().parent
+MARKET_DIR = BASE_DIR / "MarketDashboard"
+FAMA_DIR = BASE_DIR / "FamaFrench"
+FAMA_INDEX = FAMA_DIR / "index.html"
+FACTOR_CSV = FAMA_DIR / "stock_factor_data.csv"
+RETURNS_CSV = FAMA_DIR / "stock_returns_data.csv"
+LEGAL_DIR = BASE_DIR / "Legal"
+STATIC_DIR = BASE_DIR / "static"
+
+logger = logging.getLogger(__name__)
+
+# Streamlit re-executes this script on every rerun; cache_resource keeps the compiled patterns
+# and file contents across reruns and sessions without unpickling a copy of each string per hit
+@st.cache_resource
+def _compiled_pattern(pattern):
+    # Same case rule as fnmatch.fnmatch: names are matched case-insensitively where the OS folds case (Windows)
+    flags = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+    return re.compile(fnmatch.translate(pattern), flags).match
+
+
+def _read_text(file_path):
+    # Pre-compressed reports (*.html.gz) are read as-is and decompressed here
+    if os.fspath(file_path).endswith('.gz'):
+        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+            return f.read()
+    return Path(file_path).read_text(encoding='utf-8')
+
+
+# The mtime is part of the cache key so a rewritten file is read again; stale entries expire with the TTL
+@st.cache_resource(ttl=3600, show_spinner=False)
+def read_text_file(file_path, mtime):
+    return _read_text(file_path)
+
+
+# Pages shipped to the browser are minified once per file version when minify-html is installed;
+# inline JS is left alone since some reports embed data the minifier should not touch
+@st.cache_resource(ttl=3600, show_spinner=False)
+def read_page_html(file_path, mtime):
+    html = _read_text(file_path)
+    if minify_html is None: return html
+    try:
+        return minify_html.minify(html, minify_css=True, minify_js=False)
+    except Exception:
+        return html
+
+
 def load_weekly_analysis():
-    file_path = os.path.join("WeeklyContent", "latest_analysis.md")
-    return open(file_path, 'r', encoding='utf-8').read() if os.path.exists(file_path) else "⚠️ Analysis not found."
+    file_path = BASE_DIR / "WeeklyContent" / "latest_analysis.md"
+    try:
+        return read_text_file(file_path, os.stat(file_path).st_mtime)
+    except FileNotFoundError:
+        return "⚠️ Analysis not found."
 
 
 def load_html_file(file_path):
-    return open(file_path, 'r', encoding='utf-8').read() if os.path.exists(
-        file_path) else f"⚠️ File not found: {file_path}"
+    try:
+        return read_page_html(file_path, os.stat(file_path).st_mtime)
+    except FileNotFoundError:
+        return f"⚠️ File not found: {file_path}"
+
+
+# A directory's mtime moves whenever an entry is added, removed or renamed, so the scan is cached per
+# directory mtime; a repeat lookup costs one stat of the folder and one of the report it points at
+@st.cache_data(max_entries=256, show_spinner=False)
+def _scan_latest(folder_path, pattern, dir_mtime):
+    # Single scandir pass keeping only the newest match; DirEntry.stat() is one syscall per file
+    match = _compiled_pattern(pattern)
+    best, best_mtime = None, -1.0
+    with os.scandir(folder_path) as it:
+        for e in it:
+            # A gzipped copy counts as a match for its uncompressed name; written last, it wins on mtime
+            if (match(e.name) or e.name.endswith('.gz') and match(e.name[:-3])) and e.is_file():
+                m = e.stat().st_mtime
+                if m > best_mtime:
+                    best, best_mtime = e.path, m
+    return best
+
+
+def _find_latest(folder_path, pattern):
+    try:
+        dir_mtime = os.stat(folder_path).st_mtime
+    except FileNotFoundError:
+        return None, f"Dir not found: {folder_path}"
+    latest_file = _scan_latest(folder_path, pattern, dir_mtime)
+    if latest_file is None: return None, f"No files found in {folder_path}"
+    # Reports rewritten in place keep the directory mtime, so the file's own mtime is always re-read
+    try:
+        return latest_file, os.stat(latest_file).st_mtime
+    except FileNotFoundError as e:
+        return None, str(e)
 
 
 def get_latest_file_content(folder_path, pattern="*.html"):
-    if not os.path.exists(folder_path): return None, f"Dir not found: {folder_path}"
-    list_of_files = glob.glob(os.path.join(folder_path, pattern))
-    if not list_of_files: return None, f"No files found in {folder_path}"
-    latest_file = max(list_of_files, key=os.path.getctime)
+    latest_file, info = _find_latest(folder_path, pattern)
+    if latest_file is None: return None, info
     try:
-        with open(latest_file, 'r', encoding='utf-8') as f:
-            return f.read(), os.path.basename(latest_file)
+        return read_page_html(latest_file, info), os.path.split(latest_file)[1]
     except Exception as e:
         return None, str(e)
 
 
-def load_stock_dna_with_injection():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    html_path = os.path.join(current_dir, "FamaFrench", "index.html")
-    if not os.path.exists(html_path): return "HTML not found"
-    with open(html_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+def _js_string(text):
+    # JSON string literal, with "</" and "<!--" escaped so the data cannot close the surrounding script tag
+    return json.dumps(text, ensure_ascii=False).replace('</', '<\\/').replace('<!--', '<\\!--')
+
+
+# st.iframe replaces the deprecated components.html on current Streamlit; older releases keep the component
+def embed_html(html, height, scrolling=False):
+    if hasattr(st, "iframe"):
+        st.iframe(html, height=height)
+    else:
+        components.html(html, height=height, scrolling=scrolling)
+
+
+# Tall dashboards are mounted into a nested iframe only once their placeholder scrolls into view,
+# so the browser does not fetch or parse megabytes of chart script for content the user never reaches
+LAZY_IFRAME_TEMPLATE = """<style>html, body { margin: 0; }</style>
+<div id="lazy-frame" style="height: {{HEIGHT}}px;"></div>
+<script>
+(function () {
+    const box = document.getElementById('lazy-frame');
+    const mount = () => {
+        const f = document.createElement('iframe');
+        f.style.cssText = 'width: 100%; height: {{HEIGHT}}px; border: 0;';
+        f.{{ATTR}} = {{SOURCE}};
+        box.replaceChildren(f);
+    };
+    if (!('IntersectionObserver' in window)) return mount();
+    const obs = new IntersectionObserver(entries => {
+        if (entries[0].isIntersecting) { obs.disconnect(); mount(); }
+    });
+    obs.observe(box);
+})();
+</script>"""
+
+
+# Prefetch publishes several routes at once and some share a folder (US / HK Option), so the prune and
+# write below run under one lock
+_PUBLISH_LOCK = threading.Lock()
+
+
+# With server.enableStaticServing on, reports are linked into ./static and loaded by URL instead, so the
+# browser fetches and caches them over HTTP rather than receiving the whole page over the websocket
+@st.cache_resource(show_spinner=False)
+def publish_static(file_path, mtime):
+    rel_path = os.path.relpath(file_path, BASE_DIR)
+    if file_path.endswith('.gz'): rel_path = rel_path[:-3]
+    dest = os.path.join(STATIC_DIR, rel_path)
+    dest_dir, src_dir = os.path.dirname(dest), os.path.dirname(file_path)
+    tmp = dest + '.tmp'
+    url = f"app/static/{rel_path.replace(os.sep, '/')}?v={int(mtime)}"
+    with _PUBLISH_LOCK:
+        os.makedirs(dest_dir, exist_ok=True)
+        # Drop published copies whose source report has since been removed
+        for name in os.listdir(dest_dir):
+            source = os.path.join(src_dir, name)
+            if name != os.path.basename(dest) and not (os.path.exists(source) or os.path.exists(source + '.gz')):
+                try:
+                    os.remove(os.path.join(dest_dir, name))
+                except FileNotFoundError:
+                    pass
+        # Written under a temp name and swapped in, so a browser never fetches a half-written page
+        if file_path.endswith('.gz'):
+            # Served files must be plain HTML; a .gz would go out as application/gzip
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(read_page_html(file_path, mtime))
+        elif os.path.exists(dest) and os.path.samefile(file_path, dest):
+            # Already linked by an earlier run (renaming a link onto itself would leave the temp name behind)
+            return url
+        else:
+            # Static serving rejects symlinks that resolve outside ./static, so hard-link (or copy) the file in
+            try:
+                os.link(file_path, tmp)
+            except OSError:
+                shutil.copy2(file_path, tmp)
+        os.replace(tmp, dest)
+    return url
+
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def build_lazy_iframe(file_path, mtime, height):
+    # Static serving mounts the published URL; otherwise the page itself goes in as srcdoc
+    if st.get_option("server.enableStaticServing"):
+        attr, source = 'src', publish_static(file_path, mtime)
+    else:
+        attr, source = 'srcdoc', read_page_html(file_path, mtime)
+    return (LAZY_IFRAME_TEMPLATE.replace('{{HEIGHT}}', str(height))
+            .replace('{{ATTR}}', attr).replace('{{SOURCE}}', _js_string(source)))
+
+
+def render_latest_lazy(folder_path, pattern="*.html", height=2000):
+    latest_file, info = _find_latest(folder_path, pattern)
+    if latest_file is None: return info
+    try:
+        embed_html(build_lazy_iframe(latest_file, info, height), height=height)
+    except Exception as e:
+        return str(e)
+
 
-    # Simple injection logic for Factors/Returns
-    for csv_name, var_name in [("stock_factor_data.csv", "csvData"), ("stock_returns_data.csv", "returnsCSVData")]:
-        csv_path = os.path.join(current_dir, "FamaFrench", csv_name)
-        if os.path.exists(csv_path):
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                data = f.read().replace('`', '')
-            injection = f"var {var_name} = `{data}`;\nPapa.parse({var_name}, {{ download: false, "
-            html_content = html_content.replace(f'Papa.parse("{csv_name}", {{', injection)
+def warm_latest_lazy(folder_path, pattern="*.html", height=2000):
+    # Fills the same caches render_latest_lazy reads from, without emitting anything
+    latest_file, info = _find_latest(folder_path, pattern)
+    if latest_file is None: return
+    build_lazy_iframe(latest_file, info, height)
 
-    return html_content.replace('download: true,', '')
+
+# Returns are shipped to the page as a float32 blob instead of a CSV for PapaParse to re-parse;
+# the encoded blob is persisted to disk so restarts only re-encode when the CSV changes
+@st.cache_data(show_spinner=False, persist="disk")
+def encode_returns_csv(csv_path, mtime):
+    df = pd.read_csv(csv_path, index_col=0)
+    data = df.to_numpy(dtype='<f4').tobytes(order='F')
+    return {"cols": df.columns.tolist(), "n": len(df), "data": base64.b64encode(data).decode('ascii')}
+
+
+# The factor CSV is escaped once per file version and persisted alongside the returns blob
+@st.cache_data(show_spinner=False, persist="disk")
+def encode_factor_csv(csv_path, mtime):
+    return _js_string(Path(csv_path).read_text(encoding='utf-8'))
+
+
+# All injection points in FamaFrench/index.html, substituted in one pass over the page
+STOCK_DNA_MARKERS = re.compile(r'Papa\.parse\("stock_factor_data\.csv", \{|var returnsBlob = null;|download: true,')
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def build_stock_dna_html(mtimes):
+    # mtimes follows (FAMA_INDEX, FACTOR_CSV, RETURNS_CSV); None marks a missing file
+    if mtimes[0] is None: return "HTML not found"
+    html_content = read_text_file(FAMA_INDEX, mtimes[0])
+
+    injections = {'download: true,': ''}
+    if mtimes[1] is not None:
+        data = encode_factor_csv(str(FACTOR_CSV), mtimes[1])
+        injections['Papa.parse("stock_factor_data.csv", {'] = \
+            f"var csvData = {data};\nPapa.parse(csvData, {{ download: false, "
+
+    if mtimes[2] is not None:
+        blob = encode_returns_csv(str(RETURNS_CSV), mtimes[2])
+        injections['var returnsBlob = null;'] = f'var returnsBlob = {json.dumps(blob)};'
+
+    return STOCK_DNA_MARKERS.sub(lambda m: injections.get(m.group(0), m.group(0)), html_content)
+
+
+def load_stock_dna_with_injection():
+    paths = (FAMA_INDEX, FACTOR_CSV, RETURNS_CSV)
+    return build_stock_dna_html(tuple(os.path.getmtime(p) if p.exists() else None for p in paths))
 
 
 # ==========================================
 # 4. Main App Interface
 # ==========================================
 
+# Second-level menus; only the one for the selected section is built on each rerun
+SUBMENUS = {
+    "Market Intelligence": (
+        ["Market Risk", "Market Breadth", "Economic Calendar", "Industry Heatmap"],
+        ["activity", "bar-chart-line", "calendar-event", "grid-3x3"],
+    ),
+    "Equity Research": (
+        ["Stock DNA", "Thematic Basket", "ETF Smart Money", "Insider Trading", "Short Squeeze", "Earnings"],
+        ["radar", "basket", "graph-up-arrow", "people", "lightning-charge", "cash-coin"],
+    ),
+    "Equity Vol": (
+        ["US Option", "HK Option", "Volume Profile", "Intraday Volatility", "HSI CBBC Ladder",
+         "Volatility Target"],
+        ["currency-dollar", "globe-asia-australia", "bar-chart-steps", "lightning-charge",
+         "distribute-vertical", "bullseye"],
+    ),
+}
+
+
+def _submenu(section, options, icons):
+    # Each section remembers its last page in session_state, so leaving a section and coming back
+    # restores it; the fixed key keeps one menu instance per section mounted across reruns
+    last_pages = st.session_state.setdefault("_last_subpage", {})
+    last = last_pages.get(section)
+    page = option_menu(
+        menu_title=None,
+        options=options,
+        icons=icons,
+        default_index=options.index(last) if last in options else 0,
+        key=f"submenu_{section}",
+        styles={"nav-link": {"font-size": "14px"}}
+    )
+    last_pages[section] = page
+    return page
+
+
 with st.sidebar:
     # --- CHANGED: Removed Name, kept generic ---
-    st.markdown("""
-    <div style='padding: 20px 0px; text-align: center; border-bottom: 1px solid #374151; margin-bottom: 20px;'>
-        <h2 style='color: #F3F4F6; margin:0; letter-spacing: 1px; font-weight: 700;'>Quant Research</h2>
-        <p style='color: #9CA3AF; font-size: 0.85em; margin-top:5px;'>Equity Strategy & Risk</p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(compact_markup(SIDEBAR_HEADER), unsafe_allow_html=True)
 
     selected_nav = option_menu(
         menu_title="Navigation",
@@ -171,45 +457,22 @@ with st.sidebar:
 
     target_page = selected_nav
 
-    if selected_nav == "Market Intelligence":
-        target_page = option_menu(
-            menu_title=None,
-            options=["Market Risk", "Market Breadth", "Economic Calendar", "Industry Heatmap"],
-            icons=["activity", "bar-chart-line", "calendar-event", "grid-3x3"],
-            styles={"nav-link": {"font-size": "14px"}}
-        )
-
-    elif selected_nav == "Equity Research":
-        target_page = option_menu(
-            menu_title=None,
-            options=["Stock DNA", "Thematic Basket", "ETF Smart Money", "Insider Trading", "Short Squeeze", "Earnings"],
-            icons=["radar", "basket", "graph-up-arrow", "people", "lightning-charge", "cash-coin"],
-            styles={"nav-link": {"font-size": "14px"}}
-        )
-
-    elif selected_nav == "Equity Vol":
-        target_page = option_menu(
-            menu_title=None,
-            options=["US Option", "HK Option", "Volume Profile", "Intraday Volatility", "HSI CBBC Ladder",
-                     "Volatility Target"],
-            icons=["currency-dollar", "globe-asia-australia", "bar-chart-steps", "lightning-charge",
-                   "distribute-vertical", "bullseye"],
-            styles={"nav-link": {"font-size": "14px"}}
-        )
+    if selected_nav in SUBMENUS:
+        target_page = _submenu(selected_nav, *SUBMENUS[selected_nav])
 
 # ==========================================
 # 5. Content Routing
 # ==========================================
 
-if target_page == "Home":
+def _render_home():
     col_main, col_profile = st.columns([0.7, 0.3], gap="large")
     with col_main:
         # --- CHANGED: Generic Title, Removed Chinese Marketing, Removed Promo Links ---
-        st.markdown("<h1 style='color:white;'>Independent Quantitative Research</h1>", unsafe_allow_html=True)
-        st.markdown("<h3 style='color:#94a3b8;'>Systematic Alpha & Risk Premia Modeling</h3>", unsafe_allow_html=True)
+        st.markdown("<h1 style='color:white;'>Independent Quantitative Research</h1>\n"
+                    "<h3 style='color:#94a3b8;'>Systematic Alpha & Risk Premia Modeling</h3>", unsafe_allow_html=True)
 
         # Keep TradingView
-        components.html("""
+        embed_html("""
         <div class="tradingview-widget-container">
           <div class="tradingview-widget-container__widget"></div>
           <script type="text/javascript" src="https://s3.tradingview.com/external-embedding/embed-widget-ticker-tape.js" async>
@@ -246,100 +509,113 @@ if target_page == "Home":
             </div>
         """, unsafe_allow_html=True)
 
-# ... (Routing for other pages remains standard) ...
-
-elif target_page == "Market Risk":
-    html_content, _ = get_latest_file_content("ImpliedParameters")
-    if html_content: components.html(html_content, height=2200, scrolling=True)
 
-elif target_page == "Market Breadth":
-    html_content, _ = get_latest_file_content(os.path.join("MarketDashboard", "MarketBreadth"), "market_breadth_*.html")
-    if html_content: components.html(html_content, height=2200, scrolling=True)
+def _latest_route(folder_path, pattern="*.html", height=1200, title=None):
+    def render():
+        if title: st.title(title)
+        html_content, _ = get_latest_file_content(folder_path, pattern)
+        if html_content: embed_html(html_content, height=height, scrolling=True)
+    render.warm = lambda: get_latest_file_content(folder_path, pattern)
+    return render
 
-elif target_page == "Economic Calendar":
-    html_content, _ = get_latest_file_content(os.path.join("MarketDashboard", "EconomicCalendar"),
-                                              "calendar_report_*.html")
-    if html_content: components.html(html_content, height=1200, scrolling=True)
 
-elif target_page == "Industry Heatmap":
-    html_content, _ = get_latest_file_content("MarketDashboard", "sector_etf_heatmap_*.html")
-    if html_content: components.html(html_content, height=1200, scrolling=True)
+def _lazy_route(folder_path, pattern="*.html", height=2000):
+    def render():
+        error_msg = render_latest_lazy(folder_path, pattern, height)
+        if error_msg:
+            st.error(f"⚠️ Could not load data. Error: {error_msg}")
+    render.warm = lambda: warm_latest_lazy(folder_path, pattern, height)
+    return render
 
-elif target_page == "Stock DNA":
-    st.title("🧬 Factor DNA Analysis")
-    components.html(load_stock_dna_with_injection(), height=1200, scrolling=True)
-
-elif target_page == "Thematic Basket":
-    html_content, _ = get_latest_file_content("ThematicBasket", "elite_signal_dashboard_*.html")
-    if html_content: components.html(html_content, height=2500, scrolling=True)
-
-elif target_page == "ETF Smart Money":
-    html_content, _ = get_latest_file_content("xETF", "ETF_Smart_Money_Report_*.html")
-    if html_content: components.html(html_content, height=2000, scrolling=True)
-
-elif target_page == "Insider Trading":
-    html_content, _ = get_latest_file_content("Insider", "Insider_Trading_Report_*.html")
-    if html_content: components.html(html_content, height=2000, scrolling=True)
-
-elif target_page == "Short Squeeze":
-    html_content, _ = get_latest_file_content("Short_squeeze", "Short_squeeze_*.html")
-    if html_content: components.html(html_content, height=2000, scrolling=True)
 
-elif target_page == "Earnings":
-    html_content, _ = get_latest_file_content("Earnings")
-    if html_content: components.html(html_content, height=2500, scrolling=True)
+def _file_route(file_path, height=1200):
+    render = lambda: embed_html(load_html_file(file_path), height=height)
+    render.warm = lambda: load_html_file(file_path)
+    return render
 
-elif target_page == "US Option":
-    html_content, _ = get_latest_file_content("Option", "option_strike_analysis_*.html")
-    if html_content: components.html(html_content, height=2000, scrolling=True)
 
-elif target_page == "HK Option":
-    html_content, _ = get_latest_file_content("Option", "HK_Option_Market_Analysis_v6_*.html")
-    if html_content: components.html(html_content, height=2000, scrolling=True)
+def _render_stock_dna():
+    st.title("🧬 Factor DNA Analysis")
+    embed_html(load_stock_dna_with_injection(), height=1200, scrolling=True)
 
-elif target_page == "Volume Profile":
-    html_content, _ = get_latest_file_content("VP")
-    if html_content: components.html(html_content, height=1000, scrolling=True)
 
-elif target_page == "Intraday Volatility":
-    components.html(load_html_file(os.path.join("MarketDashboard", "Intraday_Volatility.html")), height=1200)
+_render_stock_dna.warm = load_stock_dna_with_injection
 
-elif target_page == "HSI CBBC Ladder":
-    components.html(load_html_file(os.path.join("MarketDashboard", "HSI_CBBC_Ladder.html")), height=1200)
 
-elif target_page == "Volatility Target":
+def _render_vol_target():
     # --- Kept the FIX from previous steps here ---
     st.title("Volatility Target Analysis")
-    html_content, error_msg = get_latest_file_content("VolTarget", "vol_tool_*.html")
-    if html_content:
-        components.html(html_content, height=1500, scrolling=True)
-    else:
+    error_msg = render_latest_lazy(BASE_DIR / "VolTarget", "vol_tool_*.html", height=1500)
+    if error_msg:
         st.error(f"⚠️ Could not load data. Error: {error_msg}")
 
-elif target_page == "Trade Portfolio":
-    st.title("💼 Live Trade Journal & Analytics")
-    html_content, _ = get_latest_file_content("Trade", "trade_record_*.html")
-    if html_content: components.html(html_content, height=1200, scrolling=True)
 
-elif target_page == "Legal":
+_render_vol_target.warm = lambda: warm_latest_lazy(BASE_DIR / "VolTarget", "vol_tool_*.html", height=1500)
+
+
+def _render_legal():
     tab1, tab2, tab3 = st.tabs(["Disclaimer", "Privacy", "Terms"])
     with tab1:
-        st.html(load_html_file(os.path.join("Legal", "disclaimer.html")))
+        st.html(load_html_file(LEGAL_DIR / "disclaimer.html"))
     with tab2:
-        st.html(load_html_file(os.path.join("Legal", "privacy.html")))
+        st.html(load_html_file(LEGAL_DIR / "privacy.html"))
     with tab3:
-        st.html(load_html_file(os.path.join("Legal", "terms.html")))
+        st.html(load_html_file(LEGAL_DIR / "terms.html"))
+
+
+ROUTES = {
+    "Home": _render_home,
+    "Market Risk": _lazy_route(BASE_DIR / "ImpliedParameters", height=2200),
+    "Market Breadth": _lazy_route(MARKET_DIR / "MarketBreadth", "market_breadth_*.html", 2200),
+    "Economic Calendar": _latest_route(MARKET_DIR / "EconomicCalendar", "calendar_report_*.html"),
+    "Industry Heatmap": _latest_route(MARKET_DIR, "sector_etf_heatmap_*.html"),
+    "Stock DNA": _render_stock_dna,
+    "Thematic Basket": _lazy_route(BASE_DIR / "ThematicBasket", "elite_signal_dashboard_*.html", 2500),
+    "ETF Smart Money": _lazy_route(BASE_DIR / "xETF", "ETF_Smart_Money_Report_*.html"),
+    "Insider Trading": _lazy_route(BASE_DIR / "Insider", "Insider_Trading_Report_*.html"),
+    "Short Squeeze": _lazy_route(BASE_DIR / "Short_squeeze", "Short_squeeze_*.html"),
+    "Earnings": _lazy_route(BASE_DIR / "Earnings", height=2500),
+    "US Option": _lazy_route(BASE_DIR / "Option", "option_strike_analysis_*.html"),
+    "HK Option": _lazy_route(BASE_DIR / "Option", "HK_Option_Market_Analysis_v6_*.html"),
+    "Volume Profile": _latest_route(BASE_DIR / "VP", height=1000),
+    "Intraday Volatility": _file_route(MARKET_DIR / "Intraday_Volatility.html"),
+    "HSI CBBC Ladder": _file_route(MARKET_DIR / "HSI_CBBC_Ladder.html"),
+    "Volatility Target": _render_vol_target,
+    "Trade Portfolio": _latest_route(BASE_DIR / "Trade", "trade_record_*.html", title="💼 Live Trade Journal & Analytics"),
+    "Legal": _render_legal,
+}
+
+
+def _warm_with_ctx(warm, ctx):
+    # The cached readers expect a ScriptRunContext on the calling thread, so pool threads borrow the
+    # context of the rerun that started the prefetch
+    add_script_run_ctx(threading.current_thread(), ctx)
+    warm()
+
+
+def _log_warm_failure(future):
+    if future.exception() is not None:
+        logger.warning("Prefetching a page failed", exc_info=future.exception())
+
+
+# Every report page is warmed once per server process on a background pool, so first visits hit the
+# caches instead of reading from disk; the current rerun does not wait for it
+@st.cache_resource(show_spinner=False)
+def _prefetch_pages():
+    ctx = get_script_run_ctx()
+    pool = ThreadPoolExecutor(max_workers=8)
+    for render in ROUTES.values():
+        if hasattr(render, "warm"):
+            pool.submit(_warm_with_ctx, render.warm, ctx).add_done_callback(_log_warm_failure)
+    pool.shutdown(wait=False)
+
+
+_prefetch_pages()
+
+if target_page in ROUTES:
+    ROUTES[target_page]()
 
 # ==========================================
 # 6. Global Footer
 # ==========================================
-st.markdown("""
-<div class="custom-footer">
-    <p>
-        © 2026 Quantitative Research from Anson. All rights reserved.<br>
-        <span style="font-size: 0.75rem; color: #6B7280;">
-        Not financial advice · For informational and educational purposes only.
-        </span>
-    </p>
-</div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(compact_markup(FOOTER), unsafe_allow_html=True)
@@ -1,65 +1,93 @@
+import gzip
+import hashlib
+import importlib.util
+import numpy as np
 import pandas as pd
 import yfinance as yf
 import os
+import string
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 # --- CONFIGURATION ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CSV_FILENAME = os.path.join(BASE_DIR, "etf_list.csv")
+COMPRESS_REPORT = True  # Save the report as .html.gz (the dashboard reads it directly); False for a plain .html
+HISTORY_MONTHS = 6
+PERIOD = f"{HISTORY_MONTHS}mo"
+PRICE_FIELDS = ["Close", "Volume"]  # The only fields the report reads; Open/High/Low are dropped on download
+BATCH_SIZE = 20  # Symbols per Yahoo request
+DOWNLOAD_WORKERS = 8  # Batches in flight at once
+MAX_HEATMAP_ROWS = 250  # Heatmap keeps the highest-turnover tickers beyond this
+MAX_HEATMAP_BYTES = 2_000_000  # ...and stops adding rows once the table reaches this size
+
+# --- DOWNLOAD CACHE (one parquet per ticker list; later runs only download the new days) ---
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")
+CACHE_TTL = 900  # Reruns within 15 minutes reuse the last download; intraday runs still get fresh prices
+CACHE_AVAILABLE = any(importlib.util.find_spec(m) is not None for m in ("pyarrow", "fastparquet"))
 
 # --- HTML TEMPLATE ---
-HTML_TEMPLATE = """
+# string.Template: CSS/JS braces stay literal, only the $placeholders are filled in
+HTML_TEMPLATE = string.Template("""
 <!DOCTYPE html>
 <html>
 <head>
     <title>ETF Smart Money Tracker</title>
     <meta charset="utf-8">
-    <link rel="stylesheet" type="text/css" href="https://cdn.datatables.net/1.11.5/css/jquery.dataTables.css">
     <style>
-        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background-color: #f4f6f9; padding: 20px; color: #333; }}
-        .container {{ max-width: 98%; margin: 0 auto; background: white; padding: 30px; border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.08); }}
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background-color: #f4f6f9; padding: 20px; color: #333; }
+        .container { max-width: 98%; margin: 0 auto; background: white; padding: 30px; border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.08); }
 
-        h1 {{ color: #2c3e50; margin-bottom: 5px; border-bottom: 2px solid #eee; padding-bottom: 15px; }}
-        .subtitle {{ color: #7f8c8d; font-size: 0.95em; margin-top: 5px; margin-bottom: 20px; }}
+        h1 { color: #2c3e50; margin-bottom: 5px; border-bottom: 2px solid #eee; padding-bottom: 15px; }
+        .subtitle { color: #7f8c8d; font-size: 0.95em; margin-top: 5px; margin-bottom: 20px; }
 
         /* --- LAYOUT GRID --- */
-        .tables-row {{ display: flex; justify-content: space-between; gap: 20px; margin-bottom: 40px; }}
-        .table-column {{ width: 49%; display: flex; flex-direction: column; }}
+        .tables-row { display: flex; justify-content: space-between; gap: 20px; margin-bottom: 40px; }
+        .table-column { width: 49%; display: flex; flex-direction: column; }
 
-        h2 {{ margin-top: 0; margin-bottom: 15px; color: #34495e; font-size: 1.3em; display: flex; align-items: center; border-bottom: 2px solid #f0f0f0; padding-bottom: 10px; }}
-        .badge {{ padding: 5px 10px; border-radius: 4px; font-size: 0.8em; font-weight: bold; margin-right: 10px; }}
-        .badge-pos {{ background-color: #e8f5e9; color: #2e7d32; border: 1px solid #c8e6c9; }}
-        .badge-neg {{ background-color: #ffebee; color: #c62828; border: 1px solid #ffcdd2; }}
+        h2 { margin-top: 0; margin-bottom: 15px; color: #34495e; font-size: 1.3em; display: flex; align-items: center; border-bottom: 2px solid #f0f0f0; padding-bottom: 10px; }
+        .badge { padding: 5px 10px; border-radius: 4px; font-size: 0.8em; font-weight: bold; margin-right: 10px; }
+        .badge-pos { background-color: #e8f5e9; color: #2e7d32; border: 1px solid #c8e6c9; }
+        .badge-neg { background-color: #ffebee; color: #c62828; border: 1px solid #ffcdd2; }
 
         /* Compact Table Styling */
-        table.dataTable {{ width: 100% !important; border-collapse: collapse; font-size: 0.85em; }}
-        th {{ background-color: #2c3e50; color: white; padding: 8px; text-align: left; font-weight: 600; }}
-        td {{ padding: 6px 8px; border-bottom: 1px solid #eee; }}
+        table.display { width: 100% !important; border-collapse: collapse; font-size: 0.85em; }
+        table.display th { cursor: pointer; }
+        table.display th[data-sort="desc"]::after { content: " \\25BC"; }
+        table.display th[data-sort="asc"]::after { content: " \\25B2"; }
+        th { background-color: #2c3e50; color: white; padding: 8px; text-align: left; font-weight: 600; }
+        td { padding: 6px 8px; border-bottom: 1px solid #eee; }
 
         /* Educational Section */
-        .edu-section {{ background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin-top: 10px; margin-bottom: 30px; border-left: 5px solid #2980b9; }}
-        .edu-title {{ font-size: 1.2em; font-weight: bold; color: #2980b9; margin-bottom: 15px; }}
-        .edu-grid {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 20px; }}
-        .edu-box h3 {{ font-size: 1em; color: #444; margin-bottom: 8px; }}
-        .edu-box p {{ font-size: 0.9em; line-height: 1.5; color: #666; }}
+        .edu-section { background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin-top: 10px; margin-bottom: 30px; border-left: 5px solid #2980b9; }
+        .edu-title { font-size: 1.2em; font-weight: bold; color: #2980b9; margin-bottom: 15px; }
+        .edu-grid { display: grid; grid-template-columns: repeat(4, 1fr); gap: 20px; }
+        .edu-box h3 { font-size: 1em; color: #444; margin-bottom: 8px; }
+        .edu-box p { font-size: 0.9em; line-height: 1.5; color: #666; }
 
         /* --- COLLAPSIBLE TABLE STYLES (NEW) --- */
-        .collapsible-wrapper {{
+        .collapsible-wrapper {
             position: relative;
             max-height: 450px; /* Default collapsed height (~15 rows) */
             overflow: hidden;
             transition: max-height 0.5s ease;
             border-bottom: 1px solid #eee;
-        }}
+        }
 
-        .collapsible-wrapper.expanded {{
+        .collapsible-wrapper.expanded {
             max-height: none; /* Remove limit when expanded */
             overflow: visible;
-        }}
+        }
 
         /* Fade effect at the bottom when collapsed */
-        .fade-overlay {{
+        .fade-overlay {
             position: absolute;
             bottom: 0;
             left: 0;
@@ -68,9 +96,9 @@ HTML_TEMPLATE = """
             background: linear-gradient(to bottom, rgba(255,255,255,0), rgba(255,255,255,1));
             pointer-events: none;
             z-index: 5;
-        }}
+        }
 
-        .expand-btn {{
+        .expand-btn {
             display: block;
             width: 100%;
             padding: 10px;
@@ -84,33 +112,33 @@ HTML_TEMPLATE = """
             font-size: 0.9em;
             border-radius: 0 0 8px 8px;
             transition: background 0.2s;
-        }}
-        .expand-btn:hover {{ background-color: #e2e6ea; }}
+        }
+        .expand-btn:hover { background-color: #e2e6ea; }
 
         /* --- HEATMAP STYLES --- */
-        .heatmap-container {{ margin-top: 40px; overflow-x: auto; max-height: 800px; }}
-        .heatmap-table {{ width: 100%; border-collapse: separate; border-spacing: 0; font-size: 0.8em; }}
-        .heatmap-table th, .heatmap-table td {{ padding: 4px; text-align: center; border: 1px solid #ddd; }}
-        .heatmap-table th {{ background-color: #34495e; color: white; white-space: nowrap; position: sticky; top: 0; z-index: 20; }}
-        .heatmap-ticker {{ text-align: left !important; font-weight: bold; background-color: #f9f9f9; position: sticky; left: 0; z-index: 10; border-right: 1px solid #ccc; }}
-        .heatmap-underlying {{ text-align: left !important; background-color: #f9f9f9; position: sticky; left: 60px; z-index: 10; border-right: 2px solid #333; }}
-        .group-start td {{ border-top: 3px solid #333 !important; }}
-        .heatmap-cell {{ width: 45px; height: 25px; cursor: default; color: #333; }}
+        .heatmap-container { margin-top: 40px; overflow-x: auto; max-height: 800px; }
+        .heatmap-table { width: 100%; border-collapse: separate; border-spacing: 0; font-size: 0.8em; }
+        .heatmap-table th, .heatmap-table td { padding: 4px; text-align: center; border: 1px solid #ddd; }
+        .heatmap-table th { background-color: #34495e; color: white; white-space: nowrap; position: sticky; top: 0; z-index: 20; }
+        .heatmap-ticker { text-align: left !important; font-weight: bold; background-color: #f9f9f9; position: sticky; left: 0; z-index: 10; border-right: 1px solid #ccc; }
+        .heatmap-underlying { text-align: left !important; background-color: #f9f9f9; position: sticky; left: 60px; z-index: 10; border-right: 2px solid #333; }
+        .group-start td { border-top: 3px solid #333 !important; }
+        .heatmap-cell { width: 45px; height: 25px; cursor: default; color: #333; }
 
         /* Heatmap Legend */
-        .heatmap-legend {{
+        .heatmap-legend {
             margin-top: 15px; padding: 15px; background-color: #fff;
             border: 1px solid #eee; border-radius: 8px; font-size: 0.9em; color: #555;
             display: flex; align-items: center; gap: 20px;
-        }}
-        .legend-item {{ display: flex; align-items: center; gap: 8px; }}
-        .color-box {{ width: 20px; height: 20px; border-radius: 4px; border: 1px solid #ccc; }}
+        }
+        .legend-item { display: flex; align-items: center; gap: 8px; }
+        .color-box { width: 20px; height: 20px; border-radius: 4px; border: 1px solid #ccc; }
     </style>
 </head>
 <body>
     <div class="container">
         <h1>🚀 Leveraged ETF Smart Money Tracker</h1>
-        <p class="subtitle">Generated: {gen_time}</p>
+        <p class="subtitle">Generated: $gen_time</p>
 
         <div class="edu-section">
             <div class="edu-title">🎓 Guide</div>
@@ -134,7 +162,7 @@ HTML_TEMPLATE = """
             <div class="table-column">
                 <h2><span class="badge badge-pos">BULLISH</span> Positive Momentum (Today)</h2>
                 <div class="collapsible-wrapper" id="posWrapper">
-                    {table_pos_html}
+                    $table_pos_html
                     <div class="fade-overlay"></div>
                 </div>
                 <button class="expand-btn" onclick="toggleTable('posWrapper', this)">⬇️ Show All (Expand)</button>
@@ -143,7 +171,7 @@ HTML_TEMPLATE = """
             <div class="table-column">
                 <h2><span class="badge badge-neg">BEARISH</span> Negative Momentum (Today)</h2>
                 <div class="collapsible-wrapper" id="negWrapper">
-                    {table_neg_html}
+                    $table_neg_html
                     <div class="fade-overlay"></div>
                 </div>
                 <button class="expand-btn" onclick="toggleTable('negWrapper', this)">⬇️ Show All (Expand)</button>
@@ -174,65 +202,73 @@ HTML_TEMPLATE = """
             </div>
         </div>
         <div class="heatmap-container">
-            {heatmap_html}
+            $heatmap_html
         </div>
     </div>
 
-    <script src="https://code.jquery.com/jquery-3.5.1.js"></script>
-    <script src="https://cdn.datatables.net/1.11.5/js/jquery.dataTables.js"></script>
     <script>
-        $(document).ready(function() {{
-            var tableSettings = {{
-                "order": [[ 5, "desc" ]],
-                "pageLength": 100, // Show many rows, but let CSS hide them
-                "searching": true,
-                "info": false,
-                "lengthChange": false,
-                "paging": false
-                // REMOVED scrollY to allow CSS max-height to work properly
-            }};
-            $('#tablePos').DataTable(tableSettings);
-            $('#tableNeg').DataTable(tableSettings);
-
-            // Initial check: if table is short, hide the button
-            checkHeight('posWrapper');
-            checkHeight('negWrapper');
-        }});
-
-        function toggleTable(wrapperId, btn) {{
+        // Click a header to sort its table; $$ / % / commas are stripped so numbers sort numerically.
+        // Rows arrive sorted by Turnover (last column), descending.
+        function sortTable(th) {
+            var table = th.closest('table'), tbody = table.tBodies[0], col = th.cellIndex;
+            var desc = th.dataset.sort !== 'desc';
+            var key = function(row) {
+                var text = row.cells[col].textContent, num = parseFloat(text.replace(/[$$,%+]/g, ''));
+                return isNaN(num) ? text : num;
+            };
+            var rows = Array.from(tbody.rows).sort(function(a, b) {
+                var x = key(a), y = key(b);
+                var cmp = (typeof x === 'number' && typeof y === 'number') ? x - y : String(x).localeCompare(String(y));
+                return desc ? -cmp : cmp;
+            });
+            table.querySelectorAll('th').forEach(function(h) { delete h.dataset.sort; });
+            th.dataset.sort = desc ? 'desc' : 'asc';
+            tbody.append.apply(tbody, rows);
+        }
+
+        document.querySelectorAll('#tablePos th, #tableNeg th').forEach(function(th) {
+            if (th.cellIndex === th.parentNode.cells.length - 1) th.dataset.sort = 'desc';
+            th.addEventListener('click', function() { sortTable(th); });
+        });
+
+        function toggleTable(wrapperId, btn) {
             var wrapper = document.getElementById(wrapperId);
             var overlay = wrapper.querySelector('.fade-overlay');
 
-            if (wrapper.classList.contains('expanded')) {{
+            if (wrapper.classList.contains('expanded')) {
                 // Collapse
                 wrapper.classList.remove('expanded');
                 overlay.style.display = 'block';
                 btn.innerHTML = "⬇️ Show All (Expand)";
                 // Optional: Scroll back to top of table
-                wrapper.scrollIntoView({{behavior: 'smooth', block: 'start'}});
-            }} else {{
+                wrapper.scrollIntoView({behavior: 'smooth', block: 'start'});
+            } else {
                 // Expand
                 wrapper.classList.add('expanded');
                 overlay.style.display = 'none';
                 btn.innerHTML = "⬆️ Show Less (Collapse)";
-            }}
-        }}
+            }
+        }
 
-        function checkHeight(wrapperId) {{
+        function checkHeight(wrapperId) {
             var wrapper = document.getElementById(wrapperId);
             var table = wrapper.querySelector('table');
             var btn = wrapper.nextElementSibling;
             // If table is shorter than max-height (450px), hide button and overlay
-            if (table.clientHeight < 450) {{
+            if (table.clientHeight < 450) {
                 btn.style.display = 'none';
                 wrapper.querySelector('.fade-overlay').style.display = 'none';
                 wrapper.style.borderBottom = 'none';
-            }}
-        }}
+            }
+        }
+
+        // If a table is short, hide its expand button
+        checkHeight('posWrapper');
+        checkHeight('negWrapper');
     </script>
 </body>
 </html>
-"""
+""")
 
 
 def load_etf_list(csv_path):
@@ -249,274 +285,352 @@ def load_etf_list(csv_path):
         sys.exit(1)
 
 
-def download_data(tickers):
-    print(f"Fetching data for {len(tickers)} ETFs...")
+def _cache_path(tickers):
+    key = hashlib.md5((",".join(sorted(tickers)) + PERIOD).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.parquet")
+
+
+def _load_cache(path):
+    """Cached history at path, or None."""
     try:
-        data = yf.download(tickers, period="6mo", group_by='ticker', progress=True, threads=True)
-        return data
+        return pd.read_parquet(path)
+    except FileNotFoundError:
+        return None
     except Exception as e:
-        print(f"Fatal Error downloading data: {e}")
+        print(f"Cache read skipped: {e}")
         return None
 
 
-def process_summary_data(data, tickers, underlying_map):
-    results = []
-    is_multi_level = isinstance(data.columns, pd.MultiIndex)
-
-    for ticker in tickers:
-        try:
-            if is_multi_level:
-                if ticker not in data.columns.levels[0]: continue
-                df = data[ticker]
-            else:
-                if len(tickers) == 1:
-                    df = data
-                else:
-                    continue
-
-            if df.empty or len(df) < 2: continue
-
-            latest = df.iloc[-1]
-            prev = df.iloc[-2]
-            price = latest['Close']
-            if pd.isna(price): continue
-
-            change_pct = ((price - prev['Close']) / prev['Close']) * 100
-            # User modification retained: using tail(20)
-            avg_vol = df['Volume'].tail(20).mean()
-            curr_vol = latest['Volume']
-            turnover_pct = (curr_vol / avg_vol) * 100 if avg_vol > 0 else 0
-
-            results.append({
-                "Ticker": ticker,
-                "Underlying": underlying_map.get(ticker, ""),
-                "Price": price,
-                "Change": change_pct,
-                "Volume": curr_vol,
-                "Turnover": turnover_pct
-            })
-        except Exception as e:
-            continue
-
-    return pd.DataFrame(results)
-
-
-def generate_heatmap_html(data, tickers, underlying_map, days_back=20):
-    print("Generating Heatmap...")
-
-    # 1. Determine Date Range from master data
-    master_df = None
-    is_multi_level = isinstance(data.columns, pd.MultiIndex)
-    for ticker in tickers:
-        if is_multi_level:
-            if ticker in data.columns.levels[0]:
-                master_df = data[ticker]
-                break
-        else:
-            master_df = data
-            break
-
-    if master_df is None or master_df.empty: return "<p>No data</p>"
-    dates = master_df.index[-days_back:][::-1]  # Reverse order (Latest first)
-
-    # Identify the Target "T" Date for sorting
-    target_date = dates[0]
-    print(f"Sorting heatmap by date: {target_date.date()}")
-
-    # 2. Pre-calculate metrics for sorting and grouping
-    rows_data = []
-
-    for ticker in tickers:
-        if is_multi_level:
-            if ticker not in data.columns.levels[0]: continue
-            df = data[ticker]
-        else:
-            df = data
-
-        if df.empty: continue
-
-        underlying = underlying_map.get(ticker, "Other")
-
-        # Calculate T-Day Turnover for sorting
-        try:
-            if target_date in df.index:
-                latest_vol = df['Volume'].loc[target_date]
-                if pd.isna(latest_vol): latest_vol = 0
-            else:
-                latest_vol = 0
-
-            avg_vol_63 = df['Volume'].tail(63).mean()
-            t_turnover = (latest_vol / avg_vol_63 * 100) if (avg_vol_63 > 0) else 0
-        except:
-            t_turnover = 0
-
-        rows_data.append({
-            "ticker": ticker,
-            "underlying": underlying,
-            "t_turnover": t_turnover,
-            "df": df
-        })
-
-    # 3. Grouping and Sorting Logic
-    groups = {}
-    for row in rows_data:
-        u = row['underlying']
-        if u not in groups: groups[u] = []
-        groups[u].append(row)
-
-    # Calculate Max Turnover per Group
-    group_max_turnover = {}
-    for u, rows in groups.items():
-        if not rows:
-            group_max_turnover[u] = 0
-            continue
-        max_t = max([r['t_turnover'] for r in rows])
-        group_max_turnover[u] = max_t
-        # Sort tickers WITHIN the group by turnover
-        rows.sort(key=lambda x: x['t_turnover'], reverse=True)
-
-    # Sort GROUPS by their max turnover
-    sorted_groups = sorted(groups.items(), key=lambda item: group_max_turnover[item[0]], reverse=True)
-
-    # 4. Generate HTML
-    html = '<table class="heatmap-table">'
-
-    # Header
-    html += '<thead><tr>'
-    html += '<th class="heatmap-ticker" style="min-width: 60px;">Ticker</th>'
-    html += '<th class="heatmap-underlying" style="min-width: 60px;">Undl</th>'
-    for i, date in enumerate(dates):
-        d_str = date.strftime('%m/%d')
-        label = "T" if i == 0 else f"T-{i}"
-        html += f'<th title="{date.strftime("%Y-%m-%d")}">{label}<br><span style="font-weight:normal; font-size:0.8em">{d_str}</span></th>'
-    html += '</tr></thead><tbody>'
-
-    # Body
-    for underlying, rows in sorted_groups:
-        is_first_in_group = True
+def _save_cache(path, data):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        data.to_parquet(path)
+    except Exception as e:
+        print(f"Cache write skipped: {e}")
 
-        for row in rows:
-            ticker = row['ticker']
-            df = row['df']
 
-            tr_class = 'class="group-start"' if is_first_in_group else ''
+def _download_batch(batch, start=None):
+    """One Yahoo request for up to BATCH_SIZE tickers, (Ticker, PRICE_FIELDS) columns; None on failure."""
+    window = {'period': PERIOD} if start is None else {'start': start}
+    try:
+        data = yf.download(batch, **window, group_by='ticker', progress=False, threads=False)
+    except Exception as e:
+        print(f"  -> Batch download failed ({batch[0]}..{batch[-1]}): {e}")
+        return None
+    if data is None or data.empty:
+        return None
+    if not isinstance(data.columns, pd.MultiIndex):
+        data = pd.concat({batch[0]: data}, axis=1)
+    return data.loc[:, data.columns.get_level_values(1).isin(PRICE_FIELDS)]
 
-            html += f'<tr {tr_class}>'
-            html += f'<td class="heatmap-ticker">{ticker}</td>'
-            html += f'<td class="heatmap-underlying">{underlying}</td>'
 
-            # User requested 20-day average consistency
-            avg_vol_series = df['Volume'].rolling(window=20).mean()
+def _download_all(tickers, start=None):
+    """All tickers in BATCH_SIZE batches across DOWNLOAD_WORKERS threads; None if every batch failed."""
+    batches = [tickers[i:i + BATCH_SIZE] for i in range(0, len(tickers), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        frames = [f for f in executor.map(lambda batch: _download_batch(batch, start), batches) if f is not None]
+    if not frames:
+        return None
+    return frames[0] if len(frames) == 1 else pd.concat(frames, axis=1)
+
+
+def _extend_history(cached, tickers):
+    """
+    Cached history plus the days Yahoo has added since, downloaded from the cache's second-to-last day.
+    That day is complete in both copies, so a Close that moved, appeared or went missing means Yahoo
+    re-adjusted the ticker (split / dividend) or returned nothing for it; those, and any ticker missing from
+    the delta (failed batch), are downloaded in full again. Cached rows are never overwritten by a missing ticker.
+    """
+    start = cached.index[-2]
+    delta = _download_all(tickers, start=start)
+    if delta is None or start not in delta.index:
+        return None
 
-            for date in dates:
-                if date not in df.index:
-                    html += '<td style="background-color: #fcfcfc;">-</td>'
-                    continue
+    old_close = cached.xs('Close', axis=1, level=1).loc[start]
+    new_close = delta.xs('Close', axis=1, level=1).loc[start].reindex(old_close.index)
+    returned = old_close.index.isin(delta.columns.get_level_values(0))
+    moved = (((old_close - new_close).abs() > 1e-4 * new_close.abs())
+             | (old_close.isna() & new_close.notna()) | (old_close.notna() & new_close.isna()) | ~returned)
+    rebased = old_close.index[moved].tolist()
+
+    # Overwrite only the cells the delta covers; a failed batch leaves its tickers' cached rows alone
+    data = cached.reindex(index=cached.index.union(delta.index), columns=cached.columns.union(delta.columns, sort=False))
+    data.loc[delta.index, delta.columns] = delta.to_numpy()
+    if rebased:
+        print(f"Re-downloading {len(rebased)} re-adjusted or missing ETFs in full...")
+        full = _download_all(rebased)
+        if full is not None:
+            got = full.columns.get_level_values(0).unique()
+            data = pd.concat([data.drop(columns=got, level=0), full], axis=1)
+    return data
 
-                try:
-                    loc_idx = df.index.get_loc(date)
-                    if loc_idx < 1:
-                        html += '<td>-</td>'
-                        continue
 
-                    curr_vol = df['Volume'].iloc[loc_idx]
-                    avg_vol = avg_vol_series.iloc[loc_idx]
-                    curr_price = df['Close'].iloc[loc_idx]
-                    prev_price = df['Close'].iloc[loc_idx - 1]
+def download_data(tickers):
+    path = _cache_path(tickers) if CACHE_AVAILABLE else None
+    cached = _load_cache(path) if path else None
+    if cached is not None and time.time() - os.path.getmtime(path) < CACHE_TTL:
+        print(f"Using cached data for {len(tickers)} ETFs ({path})")
+        return cached
+
+    data = None
+    if cached is not None and len(cached) >= 2:
+        print(f"Updating cached data for {len(tickers)} ETFs from {cached.index[-2].date()}...")
+        data = _extend_history(cached, tickers)
+    if data is None:
+        print(f"Fetching data for {len(tickers)} ETFs...")
+        data = _download_all(tickers)
+    if data is None:
+        print("Fatal Error downloading data: every batch failed")
+        return None
 
-                    if pd.isna(avg_vol) or avg_vol == 0:
-                        turnover = 0
-                    else:
-                        turnover = (curr_vol / avg_vol * 100)
+    # Same window as a fresh PERIOD download
+    data = data[data.index >= data.index[-1] - pd.DateOffset(months=HISTORY_MONTHS)]
+    if path and not data.empty:
+        _save_cache(path, data)
+    return data
+
+
+def price_matrices(data, tickers):
+    """Close and Volume as (date x ticker) frames, columns in ticker-list order."""
+    if isinstance(data.columns, pd.MultiIndex):
+        closes = data.xs('Close', axis=1, level=1)
+        vols = data.xs('Volume', axis=1, level=1)
+        # Column positions resolved once as an int array; missing tickers come back as -1
+        pos = closes.columns.get_indexer(tickers)
+        pos = pos[pos >= 0]
+        return closes.iloc[:, pos], vols.iloc[:, pos]
+    if len(tickers) == 1:
+        return data[['Close']].set_axis(tickers, axis=1), data[['Volume']].set_axis(tickers, axis=1)
+    return None, None
+
+
+def process_summary_data(data, tickers, underlyings):
+    # Whole-frame column ops over the (date x ticker) blocks instead of a per-ticker loop
+    closes, vols = price_matrices(data, tickers)
+    if closes is None or len(closes) < 2: return pd.DataFrame()
+
+    price = closes.iloc[-1]
+    prev_close = closes.iloc[-2]
+    change_pct = ((price - prev_close) / prev_close) * 100
+    # User modification retained: using tail(20)
+    avg_vol = vols.tail(20).mean()
+    curr_vol = vols.iloc[-1]
+    turnover_pct = ((curr_vol / avg_vol) * 100).where(avg_vol > 0, 0)
+
+    summary = pd.DataFrame({
+        "Ticker": price.index,
+        "Underlying": underlyings[pd.Index(tickers).get_indexer(price.index)],
+        "Price": price.to_numpy(),
+        "Change": change_pct.to_numpy(),
+        "Volume": curr_vol.to_numpy(),
+        "Turnover": turnover_pct.to_numpy()
+    })
+    return summary[summary['Price'].notna()].reset_index(drop=True)
+
+
+if njit is not None:
+    # One prange iteration per day row; same clip / direction / low-turnover rules as the NumPy path
+    @njit(parallel=True, cache=True)
+    def _heatmap_cell_kernel(turn, chg, alpha_out, up_out, low_out):
+        n, t = turn.shape
+        for i in prange(n):
+            for j in range(t):
+                a = (turn[i, j] - 50) / 250
+                if a < 0.1:
+                    a = 0.1
+                elif a > 1.0:
+                    a = 1.0
+                alpha_out[i, j] = a
+                up_out[i, j] = chg[i, j] >= 0
+                low_out[i, j] = turn[i, j] < 50
+
+
+def heatmap_cell_arrays(turn, chg):
+    """Per-cell opacity, up-day flag and below-50% flag for the [day, ticker] window."""
+    if njit is not None:
+        alpha = np.empty(turn.shape)
+        is_up = np.empty(turn.shape, dtype=np.bool_)
+        low = np.empty(turn.shape, dtype=np.bool_)
+        _heatmap_cell_kernel(np.ascontiguousarray(turn), np.ascontiguousarray(chg), alpha, is_up, low)
+        return alpha, is_up, low
+    return np.clip((turn - 50) / 250, 0.1, 1.0), chg >= 0, turn < 50
+
+
+def rolling_mean(values, window):
+    """
+    Trailing `window`-row mean of each column from one cumulative sum (same result as rolling(window).mean()).
+    NaN until the window fills and wherever the window holds a NaN, tracked by a running count of gaps.
+    """
+    gaps = np.isnan(values)
+    sums = np.cumsum(np.where(gaps, 0, values), axis=0, dtype=np.float64)
+    counts = np.cumsum(gaps, axis=0)
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        win_sum = sums[window - 1:].copy()
+        win_sum[1:] -= sums[:-window]
+        win_gaps = counts[window - 1:].copy()
+        win_gaps[1:] -= counts[:-window]
+        out[window - 1:] = np.where(win_gaps == 0, win_sum / window, np.nan)
+    return out
+
+
+def generate_heatmap_html(data, tickers, underlyings, days_back=20,
+                          max_rows=MAX_HEATMAP_ROWS, max_html_bytes=MAX_HEATMAP_BYTES):
+    print("Generating Heatmap...")
 
-                    if pd.isna(prev_price) or prev_price == 0:
-                        change_pct = 0
-                    else:
-                        change_pct = ((curr_price - prev_price) / prev_price * 100)
+    # 1. Whole-window matrices, computed once for every ticker
+    closes, vols = price_matrices(data, tickers)
+    if closes is None or closes.empty: return "<p>No data</p>"  # no rows or no tickers
+
+    # float32 is plenty for percentages shown to 0-2 decimals and halves the bytes through these passes;
+    # the prices printed in tooltips still come from the float64 closes
+    close32, vol32 = closes.astype(np.float32), vols.astype(np.float32)
+    prev_close = close32.shift(1)
+    chg_mat = ((close32 - prev_close) / prev_close * 100).mask(prev_close.isna() | (prev_close == 0), 0)
+    # User requested 20-day average consistency
+    vol_arr = vol32.to_numpy()
+    avg_arr = rolling_mean(vol_arr, 20)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        turn_arr = np.where(np.isnan(avg_arr) | (avg_arr == 0), 0, vol_arr / avg_arr * 100)
+
+    # Last `days_back` rows, latest first, as plain arrays indexed [day, ticker]; every ticker shares
+    # the download's date index, so the window is read straight off it
+    dates = closes.index[-days_back:][::-1]
+    positions = np.arange(len(closes))[-days_back:][::-1]
+    price = closes.to_numpy()[-days_back:][::-1]
+    chg = chg_mat.to_numpy()[-days_back:][::-1]
+    turn = turn_arr[-days_back:][::-1]
 
-                    # Styles
-                    if change_pct >= 0:
-                        r, g, b = 0, 150, 0
-                    else:
-                        r, g, b = 220, 20, 60
+    # Identify the Target "T" Date for sorting
+    target_date = dates[0]
+    print(f"Sorting heatmap by date: {target_date.date()}")
 
-                    alpha = (turnover - 50) / 250
-                    alpha = max(0.1, min(alpha, 1.0))
+    # 2. T-Day Turnover for sorting, against the 63-day average
+    avg_vol_63 = vols.tail(63).mean()
+    t_turnover = (vols.iloc[-1].fillna(0) / avg_vol_63 * 100).where(avg_vol_63 > 0, 0)
 
-                    if turnover < 50:
-                        bg_style = 'background-color: rgba(240,240,240,0.5); color: #ccc;'
-                    else:
-                        text_c = 'white' if alpha > 0.5 else 'black'
-                        bg_style = f'background-color: rgba({r},{g},{b},{alpha:.2f}); color: {text_c}; font-weight:bold;'
+    meta = pd.DataFrame({
+        "ticker": closes.columns,
+        "underlying": underlyings[pd.Index(tickers).get_indexer(closes.columns)],
+        "t_turnover": t_turnover.to_numpy(),
+        "col": np.arange(closes.shape[1])
+    })
 
-                    tooltip = f"Date: {date.strftime('%Y-%m-%d')}&#10;Price: ${curr_price:.2f}&#10;Change: {change_pct:+.2f}%&#10;Vol: {turnover:.0f}%"
-                    html += f'<td class="heatmap-cell" style="{bg_style}" title="{tooltip}">{turnover:.0f}</td>'
-                except:
-                    html += '<td>err</td>'
+    # 3. Grouping and Sorting: groups by their max turnover, tickers within a group by turnover
+    # (ties keep list order, so group_order is each underlying's first appearance)
+    by_group = meta.groupby("underlying", sort=False)
+    meta["group_max"] = by_group["t_turnover"].transform("max")
+    meta["group_order"] = by_group.ngroup()
+    meta = meta.sort_values(["group_max", "group_order", "t_turnover"], ascending=[False, True, False], kind="stable")
+    meta["group_start"] = meta["underlying"] != meta["underlying"].shift()
+
+    # Display order, capped at max_rows; only these columns get rendered
+    n_total = len(meta)
+    shown = meta.head(max_rows)
+    cols = shown["col"].to_numpy()
+    price, chg, turn = price[:, cols], chg[:, cols], turn[:, cols]
+
+    # 4. Every cell of the window in one pass: colour by direction, opacity by turnover
+    alpha, is_up, low = heatmap_cell_arrays(turn, chg)
+    rgb = np.where(is_up, '0,150,0', '220,20,60').astype(object)
+    text_c = np.where(alpha > 0.5, 'white', 'black').astype(object)
+    turn_s = np.char.mod('%.0f', turn).astype(object)
+    bg_style = np.where(
+        low,
+        'background-color: rgba(240,240,240,0.5); color: #ccc;',
+        'background-color: rgba(' + rgb + ',' + np.char.mod('%.2f', alpha).astype(object) + '); color: ' + text_c + '; font-weight:bold;'
+    )
+    date_s = np.array([d.strftime('%Y-%m-%d') for d in dates], dtype=object)[:, None]
+    tooltip = ('Date: ' + date_s + '&#10;Price: $' + np.char.mod('%.2f', price).astype(object)
+               + '&#10;Change: ' + np.char.mod('%+.2f', chg).astype(object) + '%&#10;Vol: ' + turn_s + '%')
+    cells = '<td class="heatmap-cell" style="' + bg_style + '" title="' + tooltip + '">' + turn_s + '</td>'
+    cells[positions < 1] = '<td>-</td>'  # no previous close to compare against
+    cells[np.isnan(price)] = '<td style="background-color: #fcfcfc;">-</td>'  # ticker has no bar that day
 
-            html += '</tr>'
-            is_first_in_group = False
+    # 5. Generate HTML (fragments collected in a list, joined once)
+    parts = ['<table class="heatmap-table">']
 
-    html += '</tbody></table>'
-    return html
+    # Header
+    parts.append('<thead><tr>')
+    parts.append('<th class="heatmap-ticker" style="min-width: 60px;">Ticker</th>')
+    parts.append('<th class="heatmap-underlying" style="min-width: 60px;">Undl</th>')
+    for i, date in enumerate(dates):
+        d_str = date.strftime('%m/%d')
+        label = "T" if i == 0 else f"T-{i}"
+        parts.append(f'<th title="{date.strftime("%Y-%m-%d")}">{label}<br><span style="font-weight:normal; font-size:0.8em">{d_str}</span></th>')
+    parts.append('</tr></thead><tbody>')
+
+    # Body: each row is a join of the precomputed cells, a few ms for MAX_HEATMAP_ROWS in total,
+    # so it stays serial; a process pool's spawn + pickling of the cell arrays would cost more than it saves
+    size = sum(len(p) for p in parts)
+    n_rendered = 0
+    for j, (ticker, underlying, is_first_in_group) in enumerate(
+            zip(shown["ticker"], shown["underlying"], shown["group_start"])):
+        tr_class = 'class="group-start"' if is_first_in_group else ''
+
+        row_parts = [f'<tr {tr_class}>', f'<td class="heatmap-ticker">{ticker}</td>',
+                     f'<td class="heatmap-underlying">{underlying}</td>', *cells[:, j], '</tr>']
+        size += sum(len(p) for p in row_parts)
+        if size > max_html_bytes: break
+        parts.extend(row_parts)
+        n_rendered += 1
+
+    parts.append('</tbody></table>')
+    if n_rendered < n_total:
+        parts.append(f'<p class="subtitle">Showing the top {n_rendered} of {n_total} ETFs by T-day turnover.</p>')
+    return ''.join(parts)
 
 
 # --- HELPERS ---
-def style_turnover(val):
-    if val < 100: return ''
-    intensity = min((val - 100) / 200, 1.0)
-    r = int(144 * (1 - intensity))
-    g = int(238 - (138 * intensity))
-    b = int(144 * (1 - intensity))
-    text_c = 'white' if intensity > 0.6 else 'black'
-    return f'background-color: rgb({r},{g},{b}); color: {text_c}; font-weight: bold;'
-
-
-def style_change_pos(val):
-    if val <= 0: return ''
-    intensity = min(val / 5, 1.0)
-    bg = f'rgba(30, 144, 255, {0.2 + (0.8 * intensity)})'
-    return f'background-color: {bg}; color: white;'
-
-
-def style_change_neg(val):
-    if val >= 0: return ''
-    intensity = min(abs(val) / 5, 1.0)
-    bg = f'rgba(255, 69, 0, {0.2 + (0.8 * intensity)})'
-    return f'background-color: {bg}; color: white;'
+def turnover_styles(turnover):
+    """Cell styles for a Turnover array: green from 100% deepening to 300%, blank below 100%."""
+    valid = turnover >= 100
+    intensity = np.where(valid, np.minimum((turnover - 100) / 200, 1.0), 0)
+    r = (144 * (1 - intensity)).astype(int).astype(str).astype(object)
+    g = (238 - (138 * intensity)).astype(int).astype(str).astype(object)
+    text_c = np.where(intensity > 0.6, 'white', 'black').astype(object)
+    styles = 'background-color: rgb(' + r + ',' + g + ',' + r + '); color: ' + text_c + '; font-weight: bold;'
+    return np.where(valid, styles, '')
+
+
+def change_styles(change, is_positive):
+    """Cell styles for a Change array: blue for gains / orange-red for losses, opaque at 5%."""
+    valid = change > 0 if is_positive else change < 0
+    intensity = np.where(valid, np.minimum(np.abs(change) / 5, 1.0), 0)
+    rgb = '30, 144, 255' if is_positive else '255, 69, 0'
+    alpha = (0.2 + (0.8 * intensity)).astype(str).astype(object)
+    return np.where(valid, f'background-color: rgba({rgb}, ' + alpha + '); color: white;', '')
 
 
 def format_table(df, table_id, is_positive):
     df = df.sort_values(by='Turnover', ascending=False)
-    styler = df.style.format({
-        "Price": "${:.2f}",
-        "Change": "{:+.2f}%",
-        "Volume": "{:,.0f}",
-        "Turnover": "{:.0f}%"
-    })
-    styler.map(style_turnover, subset=['Turnover'])
-    if is_positive:
-        styler.map(style_change_pos, subset=['Change'])
-    else:
-        styler.map(style_change_neg, subset=['Change'])
+    turnover = df['Turnover'].to_numpy(dtype=float)
+    change = df['Change'].to_numpy(dtype=float)
 
-    styler.set_table_attributes(f'id="{table_id}" class="display"')
-    try:
-        styler.hide(axis='index')
-    except:
-        styler.hide_index()
-    return styler.to_html()
+    def styled(styles):
+        return [f' style="{s}"' if s else '' for s in styles]
+
+    rows = [
+        f'<tr><td>{t}</td><td>{u}</td><td>${p:.2f}</td><td{cs}>{c:+.2f}%</td><td>{v:,.0f}</td><td{ts}>{tv:.0f}%</td></tr>'
+        for t, u, p, c, cs, v, tv, ts in zip(
+            df['Ticker'], df['Underlying'], df['Price'], change, styled(change_styles(change, is_positive)),
+            df['Volume'], turnover, styled(turnover_styles(turnover)))
+    ]
+    header = ''.join(f'<th>{col}</th>' for col in df.columns)
+    return f'<table id="{table_id}" class="display"><thead><tr>{header}</tr></thead><tbody>{"".join(rows)}</tbody></table>'
 
 
 def main():
     etf_list_df = load_etf_list(CSV_FILENAME)
     tickers = etf_list_df['Symbol'].unique().tolist()
-    underlying_map = dict(zip(etf_list_df['Symbol'], etf_list_df['Underlying']))
+    # Underlying per ticker as an array aligned with `tickers`; a repeated Symbol keeps its last row, as a dict would
+    underlyings = (etf_list_df.drop_duplicates('Symbol', keep='last').set_index('Symbol')['Underlying']
+                   .reindex(tickers).fillna("Other").to_numpy())
 
     raw_data = download_data(tickers)
     if raw_data is None or raw_data.empty: return
 
-    summary_df = process_summary_data(raw_data, tickers, underlying_map)
+    summary_df = process_summary_data(raw_data, tickers, underlyings)
 
     html_pos, html_neg = "<p>No Data</p>", "<p>No Data</p>"
     if not summary_df.empty:
@@ -525,9 +639,9 @@ def main():
         html_pos = format_table(df_pos, "tablePos", is_positive=True)
         html_neg = format_table(df_neg, "tableNeg", is_positive=False)
 
-    heatmap_html = generate_heatmap_html(raw_data, tickers, underlying_map, days_back=20)
+    heatmap_html = generate_heatmap_html(raw_data, tickers, underlyings, days_back=20)
 
-    final_html = HTML_TEMPLATE.format(
+    final_html = HTML_TEMPLATE.substitute(
         gen_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         table_pos_html=html_pos,
         table_neg_html=html_neg,
@@ -538,8 +652,14 @@ def main():
     output_filename = f"ETF_Smart_Money_Report_{timestamp_str}.html"
     output_path = os.path.join(BASE_DIR, output_filename)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(final_html)
+    if COMPRESS_REPORT:
+        # Repeated cell markup compresses ~10x; level 5 is most of level 9's gain at a fraction of the time
+        output_path += ".gz"
+        with gzip.open(output_path, "wt", encoding="utf-8", compresslevel=5) as f:
+            f.write(final_html)
+    else:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(final_html)
 
     print(f"Report saved: {output_path}")
 